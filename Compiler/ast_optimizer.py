@@ -0,0 +1,73 @@
+from collections import Counter
+from typing import Optional
+
+from myast import AstNode
+from pass_timer import PassTimer, timed
+
+
+class AstOptimizer:
+    """ Applies local AST rewrites (AstNode._optimize_node) until none of them fires.
+
+    It gives the same result as calling tree.optimize() until it returns False, but does not revisit unchanged code.
+    The dirty nodes are the worklist: a node checked without any rewrite in its subtree becomes clean,
+    a rewrite makes its parent chain dirty again, and nodes created by a rewrite are dirty from the start.
+    Each round walks the dirty nodes in the same pre-order as AstNode.optimize and skips clean subtrees,
+    the optimizer stops when the root is clean.
+    """
+
+    def __init__(self, tree: AstNode, timer: Optional[PassTimer] = None):
+        self.tree = tree
+        self.timer = timer
+        self.rounds = 0
+        self.visits = 0  # nodes checked for rewrites
+        self.saved_visits = 0  # nodes in skipped clean subtrees, that the whole tree passes would check again
+        self.rewrites = 0
+        self.fired = Counter()  # _optimize_node overrides that rewrote something, by qualified name
+
+    def run(self) -> bool:
+        """ Returns True if anything was rewritten """
+        with timed(self.timer, "ast optimize"):
+            while not self.tree._clean_subtree_size:
+                self.rounds += 1
+                self._visit(self.tree)
+        if self.timer:
+            self.timer.add_details("ast optimizer", self.stats())
+        return self.rewrites > 0
+
+    def _visit(self, node: AstNode):
+        if node._clean_subtree_size:
+            self.saved_visits += node._clean_subtree_size
+            return
+
+        self.visits += 1
+        parent = node.parent
+        if node._optimize_node():
+            self.rewrites += 1
+            self.fired[type(node)._optimize_node.__qualname__] += 1
+            self.mark_dirty(parent)
+            return
+
+        # Tentatively clean, any rewrite below resets it through the parent chain
+        node._clean_subtree_size = 1
+        size = 1
+        for child in node.children():
+            child.parent = node
+            self._visit(child)
+            size += child._clean_subtree_size
+        if node._clean_subtree_size:
+            node._clean_subtree_size = size
+
+    @staticmethod
+    def mark_dirty(node: AstNode):
+        """ Call for the parent of nodes changed outside of the optimizer """
+        while node is not None:
+            node._clean_subtree_size = 0
+            node = node.parent
+
+    def stats(self) -> dict:
+        return {"rounds": self.rounds, "rewrites": self.rewrites, "visits": self.visits,
+                "saved_visits": self.saved_visits, "fired": dict(self.fired.most_common())}
+
+    def print_stats(self):
+        print(f"AST optimizer: {self.rounds} rounds, {self.rewrites} rewrites, {self.visits} node visits, "
+              f"{self.saved_visits} visits saved compared with whole tree passes")
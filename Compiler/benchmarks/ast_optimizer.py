@@ -0,0 +1,65 @@
+"""
+AST optimizer benchmark: whole tree tree.optimize() passes compared with AstOptimizer.
+Runs both on the example programs and on a generated program with many foldable statements.
+Usage: python benchmarks/ast_optimizer.py [statements]
+"""
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ast_optimizer import AstOptimizer
+from recursive_descent_parser import Parser
+
+
+def build_source(statements: int) -> str:
+    lines = ["byte a = 1;", "byte b = 2;", "addr c = 3;"]
+    for n in range(statements):
+        lines.append(f"a = a + {n % 3} * 2 - 1;")
+        lines.append(f"if b == {n % 5} - {n % 5} then b = b + 1;")
+        lines.append(f"c = c + (1 + 2) * (b - 0);")
+    return "\n".join(lines)
+
+
+def fixpoint(source: str) -> float:
+    tree = Parser(source).do_parse()
+    start = time.perf_counter()
+    opt = True
+    while opt:
+        opt = tree.optimize()
+    return time.perf_counter() - start
+
+
+def worklist(source: str) -> (float, AstOptimizer):
+    tree = Parser(source).do_parse()
+    start = time.perf_counter()
+    optimizer = AstOptimizer(tree)
+    optimizer.run()
+    return time.perf_counter() - start, optimizer
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tests_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests")
+    sources = {}
+    for filename in sorted(glob.glob(os.path.join(tests_dir, "*.prg"))):
+        with open(filename, "rt") as f:
+            sources[os.path.basename(filename)] = f.read()
+    sources[f"generated ({statements * 3} statements)"] = build_source(statements)
+
+    print(f"{'program':<40} {'rounds':>6} {'visits':>8} {'saved':>8} {'fixpoint':>10} {'worklist':>10}")
+    for name, source in sources.items():
+        try:
+            fixpoint_time = fixpoint(source)
+        except Exception as e:
+            print(f"{name:<40} skipped: {e}")
+            continue
+        worklist_time, optimizer = worklist(source)
+        print(f"{name:<40} {optimizer.rounds:>6} {optimizer.visits:>8} {optimizer.saved_visits:>8} "
+              f"{fixpoint_time * 1000:>8.1f}ms {worklist_time * 1000:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
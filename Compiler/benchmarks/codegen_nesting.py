@@ -0,0 +1,95 @@
+"""
+Code generation benchmark for nested programs, where every variable reference looks up scope and symbol table.
+Measures time and peak memory of AST code generation only (no peephole optimization) of sudoku.prg
+and of a generated program with deeply nested conditions, and of joining code snippets alone, nested the way
+the code generator nests them (each level adds a few instructions around the code of the inner level).
+Usage: python benchmarks/codegen_nesting.py [depth] [statements per level]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ast_optimizer import AstOptimizer
+from codegen_helpers import CodeSnippet
+from instructions import Instruction, Opcode, LabelRef
+from recursive_descent_parser import Parser
+
+
+def build_source(depth: int, statements: int = 1) -> str:
+    lines = ["function f(byte a, byte b)", "begin", "byte c = 0;"]
+    for n in range(depth):
+        lines.append(f"if a > {n} then begin")
+        lines += ["c = c + a * b;"] * statements
+    lines.append("print c;")
+    lines += ["end"] * depth
+    lines += ["end", "call f(1, 2);"]
+    return "\n".join(lines)
+
+
+def nested_joins(depth: int, width: int = 10):
+    inner = CodeSnippet(0)
+    for level in range(depth):
+        head = CodeSnippet(level, Instruction(Opcode.JF, LabelRef(f"if{level}_endif")))
+        body = [CodeSnippet(level, Instruction(Opcode.PUSH, n)) for n in range(width)]
+        inner = CodeSnippet.join([head] + body + [inner])
+    return inner.codes
+
+
+def measure_joins(depth: int) -> (float, int):
+    best = None
+    for _ in range(5):
+        start = time.perf_counter()
+        nested_joins(depth)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    nested_joins(depth)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def measure(source: str, repeat: int = 50) -> (float, int):
+    """ Returns best time and peak memory of generating and flattening the code """
+    tree = Parser(source).do_parse()
+    AstOptimizer(tree).run()
+    best = None
+    for _ in range(7):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            tree.gen_code(False).codes
+        elapsed = (time.perf_counter() - start) / repeat
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    tree.gen_code(False).codes
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def report(name: str, source: str, repeat: int = 50):
+    elapsed, peak = measure(source, repeat)
+    print(f"{name}: {elapsed * 1000:.3f} ms, peak {peak / 1024:.0f} KiB")
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    statements = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    sys.setrecursionlimit(max(1000, depth * 20))
+    tests_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests")
+    with open(os.path.join(tests_dir, "sudoku.prg"), "rt") as f:
+        sudoku = f.read()
+    report("sudoku.prg", sudoku)
+    report(f"nested conditions, depth {depth}, {statements} statements per level", build_source(depth, statements), 5)
+    for join_depth in (depth, depth * 10):
+        elapsed, peak = measure_joins(join_depth)
+        print(f"snippet joins only, depth {join_depth}: {elapsed * 1000:.3f} ms, peak {peak / 1024:.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
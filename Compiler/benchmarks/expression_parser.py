@@ -0,0 +1,82 @@
+"""
+Expression parser benchmark: time spent in Parser._parse_expression on an expression heavy program.
+Only the outermost calls are timed, nested expressions (array indexes, call arguments) are included in them.
+Usage: python benchmarks/expression_parser.py [statements]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recursive_descent_parser import Parser
+
+EXPRESSIONS = [
+    "1",
+    "a",
+    "a + b * c - 3",
+    "(a + b) * (c - 1) / 2",
+    "arr[i + 1] + arr[i * 2 - 1] & 15",
+    "a << 2 | b >> 1 ^ c % 7",
+    "-a + b",
+    "~b | c",
+    "a == b && c != 3 || i >= 10",
+    "arr[arr[arr[i] + 1] + 2] * 3",
+    "a < b + 1 && (c & 1) == 0",
+    "#1000 + i * 4",
+    "'x' - 'a' + 1",
+]
+
+HEADER = """
+byte a = 1;
+byte b = 2;
+byte c = 3;
+addr i = 0;
+byte arr[100];
+"""
+
+
+def build_source(statements: int) -> str:
+    lines = [HEADER]
+    for n in range(statements):
+        lines.append(f"a = {EXPRESSIONS[n % len(EXPRESSIONS)]};")
+    return "\n".join(lines)
+
+
+def measure(source: str) -> (int, float, float):
+    """ Returns number of outermost expressions, time spent parsing them and the whole parse time """
+    original = Parser._parse_expression
+    stats = {"depth": 0, "count": 0, "time": 0.0}
+
+    def timed_parse_expression(self):
+        if stats["depth"]:
+            return original(self)
+        stats["depth"] = 1
+        start = time.perf_counter()
+        try:
+            return original(self)
+        finally:
+            stats["time"] += time.perf_counter() - start
+            stats["count"] += 1
+            stats["depth"] = 0
+
+    Parser._parse_expression = timed_parse_expression
+    try:
+        start = time.perf_counter()
+        Parser(source).do_parse()
+        total = time.perf_counter() - start
+    finally:
+        Parser._parse_expression = original
+    return stats["count"], stats["time"], total
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    source = build_source(statements)
+    count, expr_time, total = min((measure(source) for _ in range(7)), key=lambda r: r[1])
+    print(f"{count} expressions parsed in {expr_time:.3f} s = {count / expr_time:,.0f} expressions/s")
+    print(f"Whole parse: {total:.3f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Lexer throughput benchmark: tokens per second of TokenStreamLexer compared with the char by char Lexer.
+The input is built by repeating the example programs from tests folder.
+Usage: python benchmarks/lexer_throughput.py [min_lines]
+"""
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer, Symbol, TokenStreamLexer
+
+
+def build_source(min_lines: int) -> str:
+    tests_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests")
+    programs = []
+    for filename in sorted(glob.glob(os.path.join(tests_dir, "*.prg"))):
+        with open(filename, "rt") as f:
+            programs.append(f.read())
+    chunk = "\n".join(programs)
+    repeat = max(1, min_lines // (chunk.count("\n") + 1) + 1)
+    return "\n".join([chunk] * repeat)
+
+
+def measure(lexer_type, source: str) -> (int, float):
+    start = time.perf_counter()
+    lexer = lexer_type(source)
+    tokens = 0
+    while True:
+        lexer.next_symbol()
+        tokens += 1
+        if lexer.current == Symbol.EOF:
+            break
+    return tokens, time.perf_counter() - start
+
+
+def main():
+    min_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    source = build_source(min_lines)
+    print(f"Input: {source.count(chr(10)) + 1} lines, {len(source)} characters")
+    results = {}
+    for lexer_type in (Lexer, TokenStreamLexer):
+        tokens, elapsed = min((measure(lexer_type, source) for _ in range(3)), key=lambda r: r[1])
+        results[lexer_type.__name__] = elapsed
+        print(f"{lexer_type.__name__:>18}: {tokens} tokens in {elapsed:.3f} s = {tokens / elapsed:,.0f} tokens/s")
+    print(f"Speedup: {results['Lexer'] / results['TokenStreamLexer']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Peephole optimizer benchmark: time of peephole_optimize on generated code of growing size.
+Linear scaling means the time per instruction stays the same.
+Usage: python benchmarks/peephole.py [statements]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optimizer import peephole_optimize
+from recursive_descent_parser import Parser
+
+
+def build_source(statements: int) -> str:
+    lines = ["byte a = 1;", "addr b = 2;", "byte arr[10];", "addr ptrs[10];"]
+    for n in range(statements):
+        lines.append(f"a = a + arr[{n % 10}] * 3;")
+        lines.append(f"if a < {n % 200} then b = b + ptrs[a];")
+        lines.append("arr[a] = arr[a] / 2;")
+    return "\n".join(lines)
+
+
+def measure(statements: int) -> (float, int):
+    tree = Parser(build_source(statements)).do_parse()
+    best = None
+    size = 0
+    for _ in range(5):
+        code = tree.gen_code(False)  # unoptimized, peephole is run here
+        size = len(code.codes)
+        start = time.perf_counter()
+        peephole_optimize(code)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for count in (statements, statements * 4):
+        elapsed, size = measure(count)
+        print(f"{size:>8} instructions: {elapsed * 1000:8.1f} ms, {elapsed / size * 1e6:.2f} us per instruction")
+
+
+if __name__ == '__main__':
+    main()
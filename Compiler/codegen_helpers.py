@@ -1,23 +1,66 @@
-from typing import Optional, List, Iterable
+from typing import Optional, List, Iterable, Iterator, Union
 
+from frame_layout import SlotOrigin
+from instructions import Instruction, Opcode, Imm16, LabelRef
 from symbol_table import SymbolTable
 from symbols import Type
 
 
 class CodeSnippet:
-    def __init__(self, line_number: int = 0, code: str = "", type_: Optional[Type] = None):
+    """ Generated code of AST node. Joining large snippets links their instruction lists into a rope instead
+    of copying them at every level of the tree; instructions are copied into one flat list once, when codes
+    are requested """
+    __slots__ = ("type", "ln", "_parts", "_flat", "_size")
+
+    SMALL_SIZE = 16  # snippets up to this number of instructions are copied when joined
+
+    def __init__(self, line_number: int = 0, code: Optional[Instruction] = None, type_: Optional[Type] = None):
         self.type = type_
         self.ln = line_number
-        self.codes: List[str] = [code] if code else []
-        self.line_numbers = [self.ln] if code else []
-
-    def add_line(self, line):
-        self.codes.append(line)
-        self.line_numbers.append(self.ln)
+        # flat: list of instructions; otherwise list of instruction lists (chunks) and tuples of such parts
+        self._parts: list = []
+        self._flat = True
+        self._size = 0  # number of instructions when not flat
+        if code:
+            self.add_line(code)
+
+    def add_line(self, instruction: Instruction):
+        instruction.line = self.ln
+        if self._flat:
+            self._parts.append(instruction)
+        else:
+            self._parts.append([instruction])
+            self._size += 1
 
     def remove_line(self, no):
         del self.codes[no]
-        del self.line_numbers[no]
+
+    @property
+    def size(self) -> int:
+        return len(self._parts) if self._flat else self._size
+
+    @property
+    def codes(self) -> List[Instruction]:
+        """ Flat list of instructions """
+        if not self._flat:
+            self._parts = _flatten(self._parts)
+            self._flat = True
+        return self._parts
+
+    @property
+    def last_line(self) -> Optional[Instruction]:
+        """ Last instruction, without flattening the snippet """
+        part = self._parts
+        while part:
+            last = part[-1]
+            if isinstance(last, Instruction):
+                return last
+            part = last
+        return None
+
+    @property
+    def line_numbers(self) -> List[int]:
+        return [c.line for c in self.codes]
 
     def print(self):
         for c in self.codes:
@@ -25,119 +68,120 @@ class CodeSnippet:
 
     @staticmethod
     def join(snippets: Iterable[Optional["CodeSnippet"]], type_: Optional[Type] = None) -> "CodeSnippet":
+        """ Links the snippets, they should not be changed afterwards """
+        snippets = [sn for sn in snippets if sn and sn.size]
         ret = CodeSnippet(type_=type_)
+        if not snippets:
+            return ret
+        ret.ln = snippets[0].ln
+        size = sum(sn.size for sn in snippets)
+        parts = ret._parts
+        if size <= CodeSnippet.SMALL_SIZE:
+            for sn in snippets:
+                parts.extend(sn.codes)
+            return ret
+
+        ret._flat = False
+        ret._size = size
+        small_chunk = None  # consecutive small snippets are copied together
         for sn in snippets:
-            if sn:
-                for code in sn.codes:
-                    ret.codes.append(code)
-                for line in sn.line_numbers:
-                    ret.line_numbers.append(line)
-        if ret.line_numbers:
-            ret.ln = ret.line_numbers[0]
+            if sn.size <= CodeSnippet.SMALL_SIZE:
+                if small_chunk is None:
+                    small_chunk = []
+                    parts.append(small_chunk)
+                small_chunk.extend(sn.codes)
+            else:
+                parts.append(sn._parts if sn._flat else tuple(sn._parts))
+                small_chunk = None
         return ret
 
     def cast(self, expected_type: Optional[Type]):
         if expected_type is None:
             return
         if self.type == Type.Byte and expected_type == Type.Addr:
-            self.add_line("EXTEND")
-            self.line_numbers.append(self.ln)
+            self.add_line(Instruction(Opcode.EXTEND))
         elif self.type == Type.Addr and expected_type == Type.Byte:
-            self.add_line("DOWNCAST")
-            self.line_numbers.append(self.ln)
+            self.add_line(Instruction(Opcode.DOWNCAST))
+
+
+def _flatten(parts: list) -> List[Instruction]:
+    ret = []
+    stack = [iter(parts)]  # no recursion, parts of deeply nested code are deep too
+    while stack:
+        for part in stack[-1]:
+            if isinstance(part, list):
+                ret.extend(part)
+            else:
+                stack.append(iter(part))
+                break
+        else:
+            stack.pop()
+    return ret
 
 
 def generate_prolog(line_no, symbol_table: SymbolTable, function_name: str) -> CodeSnippet:
     ret = CodeSnippet(line_no)
-    vars = symbol_table.get_all_variables(function_name)
-    if not vars:
-        return ret
-    total_stack_size = 0
-    for k, var in vars.items():
-        if not var.from_global:
-            name = k
-            if var.is_array:
-                name += "[]"
-            if var.struct_def and not var.is_array:
-                total_stack_size += var.stack_size
-                ret.add_line(f"; struct {var.struct_def.name} {name}")
-            else:
-                if var.is_array and var.array_fixed_size == 0:
-                    # pointer
-                    total_stack_size += 2
-                else:
-                    # normal variable or array of known size from initializer list
-                    total_stack_size += var.stack_size
-                ret.add_line(f"; {var.type.name} {name}")
+    layout = symbol_table.get_frame_layout(function_name)
+    for slot in layout.local_slots:
+        var = slot.variable
+        name = var.name
+        if var.is_array:
+            name += "[]"
+        if var.struct_def and not var.is_array:
+            ret.add_line(Instruction(Opcode.COMMENT, comment=f"struct {var.struct_def.name} {name}"))
+        else:
+            ret.add_line(Instruction(Opcode.COMMENT, comment=f"{var.type.name} {name}"))
     # todo: initial value instead of just push
-    if total_stack_size > 0:
-        ret.add_line(f"PUSHN {total_stack_size}")
+    if layout.frame_size > 0:
+        ret.add_line(Instruction(Opcode.PUSHN, layout.frame_size))
     return ret
 
 
-def gen_load_store_instruction(line_no, symbol_table: SymbolTable, scope, name: str, load: bool) -> CodeSnippet:
-    def gen(offset, is_arg, is_16bit):
-        instr = "LOAD" if load else "STORE"
-        bbits = "16" if is_16bit else ""
-        origin = "ARG" if is_arg else "LOCAL"
-        code = f"{instr}_{origin}{bbits} {offset} ; {name}"
-        return code
+# (load, is_arg, is_16bit) -> instruction accessing a local variable or argument
+_LOCAL_ACCESS_OPCODES = {
+    (True, False, False): Opcode.LOAD_LOCAL,
+    (True, False, True): Opcode.LOAD_LOCAL16,
+    (True, True, False): Opcode.LOAD_ARG,
+    (True, True, True): Opcode.LOAD_ARG16,
+    (False, False, False): Opcode.STORE_LOCAL,
+    (False, False, True): Opcode.STORE_LOCAL16,
+    (False, True, False): Opcode.STORE_ARG,
+    (False, True, True): Opcode.STORE_ARG16,
+}
 
+
+def gen_load_store_instruction(line_no, symbol_table: SymbolTable, scope, name: str, load: bool) -> CodeSnippet:
     var = symbol_table.get_variable(scope, name)
     offs = offsetof(symbol_table, scope, name, search_in_globals=var.from_global)
 
     ret = CodeSnippet(line_no)
 
-    if var.is_arg:
-        ret.add_line(gen(offs, True, var.is_16bit))
-    elif var.from_global:
-        bits = "16" if var.is_16bit else ""
-        ret.add_line("PUSH_STACK_START")
+    if var.from_global and not var.is_arg:
+        ret.add_line(Instruction(Opcode.PUSH_STACK_START))
         if offs != 0:
-            ret.add_line(f"PUSH16 #{offs}")
-            ret.add_line("ADD16")
+            ret.add_line(Instruction(Opcode.PUSH16, Imm16(offs)))
+            ret.add_line(Instruction(Opcode.ADD16))
         if load:
-            ret.add_line(f"LOAD_GLOBAL{bits}")
+            ret.add_line(Instruction(Opcode.LOAD_GLOBAL16 if var.is_16bit else Opcode.LOAD_GLOBAL))
         else:
-            ret.add_line(f"STORE_GLOBAL{bits}")
+            ret.add_line(Instruction(Opcode.STORE_GLOBAL16 if var.is_16bit else Opcode.STORE_GLOBAL))
     else:
-        ret.add_line(gen(offs, False, var.is_16bit))
+        opcode = _LOCAL_ACCESS_OPCODES[(load, bool(var.is_arg), bool(var.is_16bit))]
+        ret.add_line(Instruction(opcode, offs, comment=name))
 
     return ret
 
 
 def offsetof(symbol_table: SymbolTable, scope, name: str, search_in_globals=False) -> int:
-    offs = 0
-    # Check function arguments
-    fsig = symbol_table.get_function_signature(scope)
-    if fsig and name in fsig.args:
-        for k, v in reversed(fsig.args.items()):
-            offs += v.stack_size
-            if k == name:
-                return offs
-
-    # Check global variables, if being in local scope:
-    if search_in_globals and scope and symbol_table.get_global_variable(name):
-        for k, v in symbol_table.get_all_variables("").items():
-            if k == name:
-                # v = self._local_variables[""][name]
-                return offs
-            offs += v.stack_size
-
-    # Check local variables
-    if not symbol_table.get_variable(scope, name):
+    slot = symbol_table.get_frame_layout(scope).get_slot(name)
+    if slot is None or (slot.origin == SlotOrigin.Global and not search_in_globals):
         raise RuntimeError(f"Unknown variable {name}")
-    for k, v in symbol_table.get_all_variables(scope).items():
-        if v.from_global:
-            continue
-        if k == name:
-            return offs
-        offs += v.stack_size
+    return slot.offset
 
 
 def _gen_address_of_str(line_no, symbol_table: SymbolTable, string_constant: str) -> CodeSnippet:
     index = symbol_table.get_index_of_string(string_constant)
-    return CodeSnippet(line_no, f"PUSH16 @string_{index}", Type.Addr)
+    return CodeSnippet(line_no, Instruction(Opcode.PUSH16, LabelRef(f"string_{index}")), Type.Addr)
 
 
 def _gen_address_of_variable(line_no, symbol_table: SymbolTable, scope, var_name) -> CodeSnippet:
@@ -148,23 +192,23 @@ def _gen_address_of_variable(line_no, symbol_table: SymbolTable, scope, var_name
     if var_def.is_array:
         return gen_load_store_instruction(line_no, symbol_table, scope, var_name, True)
     elif var_def.from_global:
-        ret.add_line("PUSH_STACK_START")
+        ret.add_line(Instruction(Opcode.PUSH_STACK_START))
         offset = offsetof(symbol_table, scope, var_name, True)
         if offset > 0:
-            ret.add_line(f"PUSH16 #{offset}")
-            ret.add_line("ADD16")
+            ret.add_line(Instruction(Opcode.PUSH16, Imm16(offset)))
+            ret.add_line(Instruction(Opcode.ADD16))
     elif var_def.is_arg:
-        ret.add_line("PUSH_REG 2")
-        ret.add_line(f"PUSH16 #{offsetof(symbol_table, scope, var_name)}")
-        ret.add_line("SUB16")
-        ret.add_line("PUSH16 #2")  # saved registers
-        ret.add_line("SUB16")
+        ret.add_line(Instruction(Opcode.PUSH_REG, 2))
+        ret.add_line(Instruction(Opcode.PUSH16, Imm16(offsetof(symbol_table, scope, var_name))))
+        ret.add_line(Instruction(Opcode.SUB16))
+        ret.add_line(Instruction(Opcode.PUSH16, Imm16(2)))  # saved registers
+        ret.add_line(Instruction(Opcode.SUB16))
     else:
-        ret.add_line("PUSH_REG 2")
+        ret.add_line(Instruction(Opcode.PUSH_REG, 2))
         offset = offsetof(symbol_table, scope, var_name)
         if offset > 0:
-            ret.add_line(f"PUSH16 #{offset}")
-            ret.add_line("ADD16")
+            ret.add_line(Instruction(Opcode.PUSH16, Imm16(offset)))
+            ret.add_line(Instruction(Opcode.ADD16))
     ret.type = Type.Addr
     return ret
 
@@ -172,13 +216,13 @@ def _gen_address_of_variable(line_no, symbol_table: SymbolTable, scope, var_name
 def write_code_to_file(code: CodeSnippet, source_text: str, filename: str, write_debug_info=False):
     with open(filename, "wt") as asm:
         if not write_debug_info:
-            asm.writelines("\n".join(code.codes))
+            asm.writelines("\n".join(str(c) for c in code.codes))
         else:
             last_line = -1
             code_lines = source_text.split("\n")
-            for line, c in zip(code.line_numbers, code.codes):
-                if line != last_line:
-                    asm.write(f"; LINE {line}: {code_lines[line - 1].strip()}\n")
-                    last_line = line
-                asm.write(c)
+            for c in code.codes:
+                if c.line != last_line:
+                    asm.write(f"; LINE {c.line}: {code_lines[c.line - 1].strip()}\n")
+                    last_line = c.line
+                asm.write(str(c))
                 asm.write("\n")
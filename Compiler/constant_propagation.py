@@ -0,0 +1,138 @@
+from typing import Dict, Optional
+
+from ast_optimizer import AstOptimizer
+from dataflow import TrackedVariables
+from myast import AstNode, AstProgram, Function, Assign, SetLocal, IncLocal, DecLocal, GroupOfStatements, Condition, \
+    WhileLoop, DoWhileLoop, FunctionCall, VariableUsage, VariableUsageLHS, VariableUsageRHS, Number
+from pass_timer import PassTimer, timed
+from symbols import Variable, Type
+
+# Known values of variables at some point of the program, missing variable = unknown
+Values = Dict[Variable, int]
+
+
+class ConstantPropagation:
+    """ Forward dataflow constant propagation over the main program and each function body.
+
+    Walks statements in execution order keeping values of scalar variables known to be constant,
+    replaces their loads (VariableUsageRHS) with Number nodes, folding is left to AstOptimizer.
+    Branches of conditions are merged, variables assigned anywhere in a loop are unknown in the whole loop.
+    Only scalars of TrackedVariables are tracked. After a call, variables passed to by-ref arguments
+    and the globals visible to functions are forgotten.
+    """
+
+    def __init__(self, tree: AstProgram, timer: Optional[PassTimer] = None):
+        self.tree = tree
+        self.timer = timer
+        self.replaced = 0  # number of loads replaced with constants
+        self._tracked = TrackedVariables(tree)
+
+    def run(self) -> bool:
+        """ Returns True if anything was replaced """
+        with timed(self.timer, "const propagation"):
+            self._sequence([b for b in self.tree.blocks if not isinstance(b, Function)], {})
+            for block in self.tree.blocks:
+                if isinstance(block, Function):
+                    self._statement(block.body, {})
+        if self.timer:
+            self.timer.add_details("constant propagation", {"replaced loads": self.replaced})
+        return self.replaced > 0
+
+    @staticmethod
+    def _mask(var: Variable, value: int) -> int:
+        return value & (0xFF if var.type == Type.Byte else 0xFFFF)
+
+    def _sequence(self, statements, values: Values):
+        for statement in list(statements):
+            self._statement(statement, values)
+
+    def _statement(self, node: AstNode, values: Values):
+        """ Updates values to the state after the statement """
+        if isinstance(node, GroupOfStatements):
+            self._sequence(node.statements, values)
+        elif isinstance(node, Assign):
+            self._expression(node.value, values)
+            self._expression(node.var, values)  # array index and struct members
+            var = node.var.definition if isinstance(node.var, VariableUsageLHS) else None
+            if var is None or node.var.array_jump or node.var.struct_child:
+                return
+            if isinstance(node.value, Number) and isinstance(node.value.value, int) and self._tracked.is_scalar(var):
+                values[var] = self._mask(var, node.value.value)
+            else:
+                values.pop(var, None)
+        elif isinstance(node, SetLocal):
+            if self._tracked.is_scalar(node.var.definition):
+                values[node.var.definition] = self._mask(node.var.definition, node.value)
+        elif isinstance(node, IncLocal):
+            var = node.var.definition
+            if var in values:
+                values[var] = self._mask(var, values[var] + (-1 if isinstance(node, DecLocal) else 1))
+        elif isinstance(node, Condition):
+            self._expression(node.condition, values)
+            else_values = dict(values)
+            self._statement(node.if_body, values)
+            if node.else_body:
+                self._statement(node.else_body, else_values)
+            self._merge(values, else_values)
+        elif isinstance(node, (WhileLoop, DoWhileLoop)):
+            self._forget_written(node, values)
+            if isinstance(node, WhileLoop):
+                self._expression(node.condition, values)
+                self._statement(node.body, dict(values))
+            else:
+                self._statement(node.body, dict(values))
+                self._expression(node.condition, values)
+        else:
+            self._expression(node, values)
+
+    def _expression(self, node: AstNode, values: Values):
+        """ Replaces known variable loads in evaluation order, calls forget what they can change """
+        for child in list(node.children()):
+            if isinstance(child, VariableUsageRHS) and self._replaceable(node, child):
+                value = values.get(child.definition)
+                if value is not None:
+                    number = Number(child.line_no, value, Type.Byte if child.definition.type == Type.Byte else Type.Addr)
+                    node.replace_child(child, number)
+                    AstOptimizer.mark_dirty(node)
+                    self.replaced += 1
+                    continue
+            self._expression(child, values)
+        if isinstance(node, FunctionCall):
+            self._forget_after_call(node, values)
+
+    @staticmethod
+    def _replaceable(parent: AstNode, usage: VariableUsageRHS) -> bool:
+        if usage.array_jump or usage.struct_child or usage.definition.is_array or usage.definition.struct_def:
+            return False
+        if isinstance(parent, FunctionCall):
+            # references must stay variables
+            for arg, arg_def in zip(parent.arguments, parent.signature.true_args):
+                if arg is usage and (arg_def.by_ref or arg_def.is_array):
+                    return False
+        return True
+
+    def _forget_after_call(self, call: FunctionCall, values: Values):
+        for arg, arg_def in zip(call.arguments, call.signature.true_args):
+            if arg_def.by_ref and isinstance(arg, VariableUsage):
+                values.pop(arg.definition, None)
+        for var in list(values):
+            if self._tracked.visible_to_calls(var):
+                del values[var]
+
+    def _forget_written(self, node: AstNode, values: Values):
+        """ Forgets variables written anywhere in the subtree """
+        if isinstance(node, Assign) and isinstance(node.var, VariableUsageLHS):
+            values.pop(node.var.definition, None)
+        elif isinstance(node, (SetLocal, IncLocal)):
+            values.pop(node.var.definition, None)
+        elif isinstance(node, FunctionCall):
+            self._forget_after_call(node, values)
+        for child in node.children():
+            self._forget_written(child, values)
+
+    @staticmethod
+    def _merge(values: Values, other: Values):
+        """ Keeps in values only the ones equal in both """
+        for var, value in list(values.items()):
+            if other.get(var) != value:
+                del values[var]
@@ -0,0 +1,80 @@
+from typing import Set
+
+from ast_optimizer import AstOptimizer
+from myast import AstNode, AstProgram, Assign, FunctionCall, GroupOfStatements, Instruction_AddressOfVariable, \
+    Syscall_ReadKey, Syscall_GetRandomNumber, NonReturningSyscall, VariableUsage, VariableUsageLHS, SetLocal, IncLocal
+from symbols import Variable, Type
+
+
+class TrackedVariables:
+    """ Tells which variables the dataflow passes can reason about.
+
+    Scalar variables are followed through loads and stores, except for:
+    - arguments, arrays and structs,
+    - variables whose address is taken with addressof, as they can be read and written through pointers.
+    Calls can read and write globals imported by functions ("global x") and by-ref arguments.
+    """
+
+    def __init__(self, tree: AstProgram):
+        symbol_table = tree.symbol_table
+        self.escaped: Set[Variable] = set()
+        self.globals_of_functions: Set[Variable] = set()  # main program variables that functions can access
+        for name in symbol_table.get_function_names():
+            for var in symbol_table.get_all_variables(name).values():
+                if var.from_global:
+                    self.globals_of_functions.add(symbol_table.get_global_variable(var.name))
+        self._find_escaped(tree)
+
+    def _find_escaped(self, node: AstNode):
+        if isinstance(node, Instruction_AddressOfVariable):
+            var = node.symbol_table.get_variable(node.scope, node.name)
+            self.escaped.add(var)
+            if var.from_global:
+                self.escaped.add(node.symbol_table.get_global_variable(var.name))
+        for child in node.children():
+            self._find_escaped(child)
+
+    def is_scalar(self, var: Variable) -> bool:
+        return (not var.is_array and not var.struct_def and not var.is_arg and var.type != Type.Struct
+                and var not in self.escaped)
+
+    def visible_to_calls(self, var: Variable) -> bool:
+        return var.from_global or var in self.globals_of_functions
+
+
+def stored_variable(node: AstNode):
+    """ Scalar variable written by a statement: the whole variable, not its element or member; or None """
+    if isinstance(node, (SetLocal, IncLocal)):
+        return node.var.definition
+    if isinstance(node, Assign) and isinstance(node.var, VariableUsageLHS):
+        if not node.var.array_jump and not node.var.struct_child:
+            return node.var.definition
+    return None
+
+
+def used_variables(node: AstNode, acc: Set[Variable]) -> Set[Variable]:
+    """ Variables read in the subtree """
+    if isinstance(node, VariableUsage):
+        if node.is_load or node.array_jump or node.struct_child:
+            acc.add(node.definition)  # element and member stores read the pointer
+    elif isinstance(node, IncLocal):
+        acc.add(node.var.definition)
+    for child in node.children():
+        used_variables(child, acc)
+    return acc
+
+
+def has_side_effects(node: AstNode) -> bool:
+    if isinstance(node, (FunctionCall, Syscall_ReadKey, Syscall_GetRandomNumber, NonReturningSyscall)):
+        return True
+    return any(has_side_effects(child) for child in node.children())
+
+
+def remove_statement(statement: AstNode):
+    """ Removes statement from its parent, leaves empty group where a statement is required (e.g. if body) """
+    parent = statement.parent
+    if isinstance(parent, (GroupOfStatements, AstProgram)):
+        parent.replace_child(statement, None)
+    else:
+        parent.replace_child(statement, GroupOfStatements(statement.line_no, []))
+    AstOptimizer.mark_dirty(parent)
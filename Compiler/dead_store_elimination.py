@@ -0,0 +1,142 @@
+from typing import Dict, List, Optional, Set
+
+from dataflow import TrackedVariables, stored_variable, used_variables, has_side_effects, remove_statement
+from myast import AstNode, AstProgram, Function, Assign, SetLocal, IncLocal, GroupOfStatements, Condition, \
+    WhileLoop, DoWhileLoop, FunctionReturn, Instruction_Break, Instruction_Continue, Instruction_Halt, VariableUsage, \
+    ArrayInitializationStatement, Instruction_AddressOfVariable
+from pass_timer import PassTimer, timed
+from symbols import Variable
+
+Live = Set[Variable]
+
+
+class _LoopTargets:
+    """ Variables live at the targets of break and continue of the innermost loop """
+    def __init__(self, break_live: Live, continue_live: Live):
+        self.break_live = break_live
+        self.continue_live = continue_live
+
+
+class DeadStoreElimination:
+    """ Removes stores never read and variables never used, per function and main program.
+
+    Backward liveness analysis over the statements finds stores to TrackedVariables scalars,
+    that are overwritten or the function ends before any read. Such stores are removed if computing
+    the stored value has no side effects. Loops are iterated until live sets stop growing.
+    Then variables without any use left are removed from the symbol table, so frames get smaller.
+    Globals visible to functions are live at every call and at the end of main program.
+    """
+
+    def __init__(self, tree: AstProgram, timer: Optional[PassTimer] = None):
+        self.tree = tree
+        self.timer = timer
+        self.removed_stores = 0
+        self.removed_variables: List[str] = []
+        self._tracked = TrackedVariables(tree)
+        self._live_after: Dict[AstNode, Live] = {}  # for stores: variables live after the statement
+
+    def run(self) -> bool:
+        """ Returns True if anything was removed """
+        with timed(self.timer, "dead stores"):
+            scopes = {"": [b for b in self.tree.blocks if not isinstance(b, Function)]}
+            for block in self.tree.blocks:
+                if isinstance(block, Function):
+                    scopes[block.name] = [block.body]
+            for scope, statements in scopes.items():
+                while self._remove_dead_stores(statements):
+                    pass
+                self._remove_unused_variables(scope, statements)
+        if self.timer:
+            self.timer.add_details("dead store elimination", {"removed stores": self.removed_stores,
+                                                              "removed variables": len(self.removed_variables)})
+        return self.removed_stores > 0 or len(self.removed_variables) > 0
+
+    def _remove_dead_stores(self, statements: List[AstNode]) -> bool:
+        self._live_after = {}
+        self._sequence(statements, set(), None)
+        removed = False
+        for statement, live in self._live_after.items():
+            var = stored_variable(statement)
+            if not self._dead_candidate(var) or var in live:
+                continue
+            if isinstance(statement, Assign) and has_side_effects(statement.value):
+                continue
+            remove_statement(statement)
+            self.removed_stores += 1
+            removed = True
+        return removed
+
+    def _dead_candidate(self, var: Optional[Variable]) -> bool:
+        return var is not None and self._tracked.is_scalar(var) and not self._tracked.visible_to_calls(var)
+
+    def _sequence(self, statements, live: Live, loop: Optional[_LoopTargets]) -> Live:
+        for statement in reversed(statements):
+            live = self._statement(statement, live, loop)
+        return live
+
+    def _statement(self, node: AstNode, live: Live, loop: Optional[_LoopTargets]) -> Live:
+        """ Returns variables live before the statement, given the ones live after it """
+        if isinstance(node, GroupOfStatements):
+            return self._sequence(node.statements, live, loop)
+        elif isinstance(node, (Assign, SetLocal, IncLocal)):
+            var = stored_variable(node)
+            if self._dead_candidate(var):
+                self._live_after[node] = self._live_after.get(node, set()) | live
+                if var not in live and not (isinstance(node, Assign) and has_side_effects(node.value)):
+                    return live  # will be removed, uses do not count
+                if not isinstance(node, IncLocal):
+                    live = live - {var}
+            return used_variables(node, set(live))
+        elif isinstance(node, Condition):
+            live_if = self._statement(node.if_body, live, loop)
+            live_else = self._statement(node.else_body, live, loop) if node.else_body else live
+            return used_variables(node.condition, live_if | live_else)
+        elif isinstance(node, WhileLoop):
+            condition_uses = used_variables(node.condition, set())
+            begin = condition_uses | live
+            while True:
+                body = self._statement(node.body, begin, _LoopTargets(live, begin))
+                new_begin = condition_uses | live | body
+                if new_begin == begin:
+                    return begin
+                begin = new_begin
+        elif isinstance(node, DoWhileLoop):
+            condition_uses = used_variables(node.condition, set())
+            begin = set()
+            while True:
+                before_condition = condition_uses | live | begin
+                new_begin = self._statement(node.body, before_condition, _LoopTargets(live, before_condition | begin))
+                if new_begin == begin:
+                    return begin
+                begin = new_begin
+        elif isinstance(node, Instruction_Break):
+            return set(loop.break_live)
+        elif isinstance(node, Instruction_Continue):
+            return set(loop.continue_live)
+        elif isinstance(node, FunctionReturn):
+            return used_variables(node, set())
+        elif isinstance(node, Instruction_Halt):
+            return set()
+        return used_variables(node, set(live))
+
+    def _remove_unused_variables(self, scope: str, statements: List[AstNode]):
+        used = set()
+        for statement in statements:
+            self._referenced(statement, used)
+        symbol_table = self.tree.symbol_table
+        for name, var in list(symbol_table.get_all_variables(scope).items()):
+            if var not in used and not (scope == "" and var in self._tracked.globals_of_functions):
+                symbol_table.remove_variable(scope, name)
+                self.removed_variables.append(f"{scope}.{name}" if scope else name)
+
+    def _referenced(self, node: AstNode, acc: Set[Variable]):
+        if isinstance(node, VariableUsage):
+            acc.add(node.definition)
+        elif isinstance(node, (SetLocal, IncLocal)):
+            acc.add(node.var.definition)
+        elif isinstance(node, ArrayInitializationStatement):
+            acc.add(node.definition)
+        elif isinstance(node, Instruction_AddressOfVariable):
+            acc.add(node.symbol_table.get_variable(node.scope, node.name))
+        for child in node.children():
+            self._referenced(child, acc)
@@ -0,0 +1,78 @@
+from enum import Enum
+from typing import Dict, Optional, List
+
+from symbols import Variable
+
+
+class SlotOrigin(Enum):
+    Arg = 1  # function argument, offset counts down from frame pointer
+    Local = 2  # variable in current function frame
+    Global = 3  # variable of main program frame, accessed from function by "global" declaration
+
+
+class FrameSlot:
+    def __init__(self, origin: SlotOrigin, offset: int, size: int, variable: Variable):
+        self.origin = origin
+        self.offset = offset
+        self.size = size
+        self.variable = variable
+
+    def __repr__(self):
+        return f"FrameSlot({self.origin.name}, {self.offset}, {self.size})"
+
+
+class FrameLayout:
+    """ Placement of all variables visible in one scope (function name, or empty string for main program).
+    Computed once from the symbol table, see SymbolTable.get_frame_layout """
+
+    def __init__(self, symbol_table: "SymbolTable", scope: str):
+        self.scope = scope
+        self.slots: Dict[str, FrameSlot] = {}
+        self.frame_size = 0  # bytes reserved by prolog of the function
+
+        signature = symbol_table.get_function_signature(scope)
+        if signature:
+            offset = 0
+            for name, var in reversed(signature.args.items()):
+                offset += var.stack_size
+                self.slots[name] = FrameSlot(SlotOrigin.Arg, offset, var.stack_size, var)
+
+        offset = 0
+        for name, var in symbol_table.get_all_variables(scope).items():
+            if var.from_global:
+                if scope:
+                    global_slot = symbol_table.get_frame_layout("").get_slot(name)
+                    if global_slot:
+                        self.slots[name] = FrameSlot(SlotOrigin.Global, global_slot.offset, global_slot.size, var)
+                continue
+            self.slots[name] = FrameSlot(SlotOrigin.Local, offset, var.stack_size, var)
+            offset += var.stack_size
+
+            if var.is_array and var.array_fixed_size == 0:
+                self.frame_size += 2  # pointer
+            else:
+                self.frame_size += var.stack_size
+
+    def get_slot(self, name: str) -> Optional[FrameSlot]:
+        return self.slots.get(name)
+
+    @property
+    def local_slots(self) -> List[FrameSlot]:
+        return [s for s in self.slots.values() if s.origin == SlotOrigin.Local]
+
+    def dump(self) -> str:
+        title = f"function {self.scope}" if self.scope else "main program"
+        lines = [f"{title}: frame {self.frame_size} bytes"]
+        for name, slot in self.slots.items():
+            var = slot.variable
+            type_name = var.struct_def.name if var.struct_def else var.type.name
+            if var.is_array:
+                type_name += "[]"
+            lines.append(f"  {slot.origin.name:<6} {slot.offset:>5} {slot.size:>5}  {type_name} {name}")
+        return "\n".join(lines)
+
+
+def dump_frame_layouts(symbol_table: "SymbolTable") -> str:
+    """ Report of frame layouts of main program and all functions """
+    scopes = [""] + symbol_table.get_function_names()
+    return "\n\n".join(symbol_table.get_frame_layout(scope).dump() for scope in scopes)
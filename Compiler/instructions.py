@@ -0,0 +1,222 @@
+from enum import Enum
+from typing import Optional
+
+
+class Opcode(Enum):
+    """ Instructions of the VM, mirrors enum I of Runtime/types.hpp (values are byte codes) """
+    NOP = 0
+    PUSH = 1
+    PUSHN = 2
+    PUSHN2 = 3
+    POP = 4
+    POPN = 5
+    POPN2 = 6
+    SWAP = 7
+    DUP = 8
+    PUSH_REG = 9
+    POP_REG = 10
+    ADD = 11
+    ADDC = 12
+    SUBC = 13
+    SUB = 14
+    SUB2 = 15
+    MUL = 16
+    MULC = 17
+    DIV = 18
+    DIV2 = 19
+    DIV216 = 20
+    MOD = 21
+    INC = 22
+    DEC = 23
+    AND = 24
+    OR = 25
+    LAND = 26
+    LOR = 27
+    FLIP = 28
+    NOT = 29
+    XOR = 30
+    LSH = 31
+    RSH = 32
+    EQ = 33
+    NE = 34
+    LESS = 35
+    LESS_OR_EQ = 36
+    GREATER = 37
+    GREATER_OR_EQ = 38
+    ZERO = 39
+    NZERO = 40
+    JMP = 41
+    JMP2 = 42
+    JF = 43
+    JF2 = 44
+    JT = 45
+    JT2 = 46
+    CASE = 47
+    ELSE = 48
+    CALL = 49
+    RET = 50
+    CALL2 = 51
+    LOAD_GLOBAL = 52
+    STORE_GLOBAL = 53
+    LOAD_GLOBAL16 = 54
+    STORE_GLOBAL16 = 55
+    LOAD_LOCAL = 56
+    LOAD_ARG = 57
+    LOAD_LOCAL16 = 58
+    LOAD_ARG16 = 59
+    STORE_LOCAL = 60
+    STORE_ARG = 61
+    STORE_LOCAL16 = 62
+    STORE_ARG16 = 63
+    INTERRUPT_HANDLER = 64
+    SYSCALL = 65
+    SYSCALL2 = 66
+    DEBUGGER = 67
+    PUSH_NEXT_SP = 68
+    PUSH16 = 69
+    ADD16 = 70
+    ADD16C = 71
+    SUB16C = 72
+    MOD16 = 73
+    SUB16 = 74
+    SUB216 = 75
+    MUL16 = 76
+    MUL16C = 77
+    INC16 = 78
+    DEC16 = 79
+    EXTEND = 80
+    DOWNCAST = 81
+    LESS16 = 82
+    LESS_OR_EQ16 = 83
+    GREATER16 = 84
+    GREATER_OR_EQ16 = 85
+    ZERO16 = 86
+    NZERO16 = 87
+    EQ16 = 88
+    NE16 = 89
+    DUP16 = 90
+    SWAP16 = 91
+    LOAD_NVRAM = 92
+    STORE_NVRAM = 93
+    PUSH16_REL = 94
+    JMP_REL = 95
+    JF_REL = 96
+    JT_REL = 97
+    CASE_REL = 98
+    ELSE_REL = 99
+    CALL_REL = 100
+    PUSH_STACK_START = 101
+    ROLL3 = 102
+    NEG = 103
+    STORE_GLOBAL2 = 104
+    STORE_GLOBAL216 = 105
+    HALT = 106
+    AND16 = 107
+    OR16 = 108
+    XOR16 = 109
+    FLIP16 = 110
+    LSH16 = 111
+    RSH16 = 112
+    JT16 = 113
+    JF16 = 114
+    MACRO_POP_EXT_X2_ADD16 = 115
+    MACRO_POP_EXT_X2_ADD16_LG16 = 116
+    MACRO_POP_EXT_X2_ADD16_LG16_LL16 = 117
+    MACRO_ADD8_TO_16 = 118
+    MACRO_ADD16_TO_8 = 119
+    MACRO_ANDX = 120
+    MACRO_ORX = 121
+    MACRO_LSH16_BY8 = 122
+    MACRO_INC_LOCAL = 123
+    MACRO_DEC_LOCAL = 124
+    MACRO_INC_LOCAL16 = 125
+    MACRO_DEC_LOCAL16 = 126
+    MACRO_X2 = 127
+    MACRO_X216 = 128
+    MACRO_X3 = 129
+    MACRO_DIV2 = 130
+    MACRO_DIV3 = 131
+    GET_PTR = 132
+    LOAD_GLOBAL_PTR = 133
+    LOAD_GLOBAL_PTR16 = 134
+    STORE_GLOBAL_PTR = 135
+    STORE_GLOBAL_PTR16 = 136
+    MACRO_CONDITIONAL_JF = 137
+    MACRO_SET_LOCAL = 138
+    MACRO_SET_LOCAL16 = 139
+    STORE_LOCAL_KEEP = 140
+    STORE_LOCAL_KEEP16 = 141
+    MACRO_LOAD_GLOBAL_VAR16 = 142
+    MACRO_LOAD_GLOBAL_VAR = 143
+
+    # Assembler directives, they do not produce instructions
+    LABEL = -1  # ":name", operand is the label name
+    COMMENT = -2  # whole line comment, text is in Instruction.comment
+    STRING = -3  # string constant data, operand is the text
+
+
+class Imm16(int):
+    """ 16-bit immediate operand, written as #value """
+    __slots__ = ()
+
+    def __str__(self):
+        return f"#{int(self)}"
+
+    def __repr__(self):
+        return str(self)
+
+
+class LabelRef(str):
+    """ Address of a label, written as @name """
+    __slots__ = ()
+
+    def __str__(self):
+        return "@" + str.__str__(self)
+
+    def __repr__(self):
+        return str(self)
+
+
+class Instruction:
+    """ Single line of generated assembly: opcode, operands (int for 8-bit values, Imm16, LabelRef,
+    or plain str for symbolic names like Std.PrintInt), optional comment and source line.
+    Text form is produced only when writing the output file """
+    __slots__ = ("opcode", "operands", "comment", "line")
+
+    def __init__(self, opcode: Opcode, *operands, comment: Optional[str] = None, line: int = 0):
+        self.opcode = opcode
+        self.operands = operands
+        self.comment = comment
+        self.line = line
+
+    @property
+    def operand(self):
+        """ First operand """
+        return self.operands[0]
+
+    def with_opcode(self, opcode: Opcode, *operands) -> "Instruction":
+        """ Copy with other opcode and operands, keeping the comment and line """
+        return Instruction(opcode, *operands, comment=self.comment, line=self.line)
+
+    def __eq__(self, other):
+        if not isinstance(other, Instruction):
+            return NotImplemented
+        return self.opcode == other.opcode and self.operands == other.operands and self.comment == other.comment
+
+    def __str__(self):
+        if self.opcode == Opcode.LABEL:
+            text = ":" + self.operands[0]
+        elif self.opcode == Opcode.STRING:
+            text = f"\"{self.operands[0]}\""
+        elif self.opcode == Opcode.COMMENT:
+            return f"; {self.comment}"
+        elif self.operands:
+            text = self.opcode.name + " " + " ".join(str(o) for o in self.operands)
+        else:
+            text = self.opcode.name
+        if self.comment:
+            text += f" ; {self.comment}"
+        return text
+
+    def __repr__(self):
+        return str(self)
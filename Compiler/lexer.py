@@ -1,4 +1,6 @@
+import re
 from enum import Enum
+from typing import List, Tuple
 
 
 class Symbol(Enum):
@@ -373,3 +375,229 @@ class Lexer:
             elif t == '#':
                 self._current = Symbol.Hash
                 return
+
+
+_KEYWORDS = {
+    "if": Symbol.If,
+    "then": Symbol.Then,
+    "else": Symbol.Else,
+    "begin": Symbol.Begin,
+    "end": Symbol.End,
+    "while": Symbol.While,
+    "do": Symbol.Do,
+    "continue": Symbol.Continue,
+    "break": Symbol.Break,
+    "function": Symbol.Function,
+    "const": Symbol.Const,
+    "return": Symbol.Return,
+    "call": Symbol.Call,
+    "print": Symbol.Print,
+    "printnl": Symbol.PrintNewLine,
+    "printch": Symbol.PrintChar,
+    "debugger": Symbol.Debugger,
+    "halt": Symbol.Halt,
+    "global": Symbol.Global,
+    "byte": Symbol.Byte,
+    "addr": Symbol.Addr,
+    "struct": Symbol.Struct,
+    "printstr": Symbol.PrintStr,
+}
+
+_OPERATORS = {
+    "==": Symbol.Equals,
+    "!=": Symbol.NotEqual,
+    ">=": Symbol.Ge,
+    ">>": Symbol.Rsh,
+    "<=": Symbol.Le,
+    "<<": Symbol.Lsh,
+    "->": Symbol.Arrow,
+    "&&": Symbol.And,
+    "||": Symbol.Or,
+    "=": Symbol.Becomes,
+    "+": Symbol.Plus,
+    "-": Symbol.Minus,
+    "*": Symbol.Mult,
+    "/": Symbol.Divide,
+    ";": Symbol.Semicolon,
+    "(": Symbol.LParen,
+    ")": Symbol.RParen,
+    ">": Symbol.Gt,
+    "<": Symbol.Lt,
+    "&": Symbol.Ampersand,
+    "|": Symbol.Pipe,
+    ",": Symbol.Comma,
+    "[": Symbol.LBracket,
+    "]": Symbol.RBracket,
+    "{": Symbol.LCurly,
+    "}": Symbol.RCurly,
+    "~": Symbol.Tilde,
+    "^": Symbol.Hat,
+    "%": Symbol.Modulo,
+    "#": Symbol.Hash,
+    ".": Symbol.Dot,
+}
+
+# Alternatives are tried in order: comments must precede the divide operator
+# and two-character operators must precede their one-character prefixes.
+# Quotes preceded by a backslash do not terminate strings, the same as in Lexer.
+# Blanks are consumed together with the following token, so most tokens take a single match;
+# only line breaks get a match of their own, to count lines.
+_TOKEN_REGEX = re.compile("[ \t\r]*(?:" + "|".join((
+    r"(?P<identifier>[^\W\d_]\w*)",
+    r"(?P<newline>(?:\n[ \t\r]*)+)",
+    r"(?P<comment>//[^\n]*)",
+    r"(?P<operator>" + "|".join(re.escape(op) for op in sorted(_OPERATORS, key=len, reverse=True)) + ")",
+    r"(?P<number>\d[\d.]*)",
+    r'"(?P<string>(?:[^"]|(?<=\\)")*)"',
+    r"'(?P<char>(?:[^']|(?<=\\)')*)'",
+    r"(?P<other>.)",
+)) + ")", re.DOTALL)
+
+
+def tokenize(input_string: str) -> Tuple[List[Symbol], list, List[int]]:
+    """ Scans the whole input in one pass.
+    Returns parallel lists of symbols, their values (identifier name, number or string content, None otherwise)
+    and line numbers. The last symbol is always EOF """
+    symbols = []
+    values = []
+    lines = []
+    line_number = 1
+    keywords = _KEYWORDS
+    operators = _OPERATORS
+
+    for m in _TOKEN_REGEX.finditer(input_string):
+        kind = m.lastgroup
+        if kind == "identifier":
+            text = m.group(kind)
+            keyword = keywords.get(text.lower())
+            if keyword is not None:
+                symbols.append(keyword)
+                values.append(None)
+            else:
+                symbols.append(Symbol.Identifier)
+                values.append(text)
+        elif kind == "operator":
+            symbols.append(operators[m.group(kind)])
+            values.append(None)
+        elif kind == "newline":
+            line_number += m.group(kind).count("\n")
+            continue
+        elif kind == "number":
+            text = m.group(kind)
+            symbols.append(Symbol.Number)
+            values.append(int(text) if '.' not in text else float(text))
+        elif kind == "comment":
+            continue
+        elif kind == "string":
+            symbols.append(Symbol.String)
+            values.append(m.group(kind))
+        elif kind == "char":
+            symbols.append(Symbol.Char)
+            values.append(m.group(kind))
+        else:
+            if m.group(kind) in ('"', "'"):
+                raise Exception(f"Error in line {line_number}: unterminated string")
+            continue  # unknown characters are skipped, like in Lexer
+        lines.append(line_number)
+
+    symbols.append(Symbol.EOF)
+    values.append(None)
+    lines.append(line_number)
+    return symbols, values, lines
+
+
+class TokenStream:
+    """ Tokenized input.
+    Besides the tokens, keeps for every position the last identifier, number and string seen so far
+    (in Lexer they keep the value of the last token of their kind), so a single index is the whole lexer state.
+    Position 0 is the state before the first token, like a freshly created Lexer """
+
+    def __init__(self, input_string: str):
+        symbols, values, lines = tokenize(input_string)
+        self.symbols = [Symbol.Nothing] + symbols
+        self.lines = [1] + lines
+        self.identifiers = [""]
+        self.numbers = [0]
+        self.strings = [""]
+        identifier, number, string = "", 0, ""
+        for symbol, value in zip(symbols, values):
+            if symbol is Symbol.Identifier:
+                identifier = value
+            elif symbol is Symbol.Number:
+                number = value
+            elif symbol is Symbol.String or symbol is Symbol.Char:
+                string = value
+            self.identifiers.append(identifier)
+            self.numbers.append(number)
+            self.strings.append(string)
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+class TokenCursor:
+    """ Position in a TokenStream, with the Lexer interface.
+    The state is a single token index: backup_state/restore_state (mark/reset) are O(1)
+    and tokens read again after a reset come from memory instead of being scanned again """
+
+    def __init__(self, stream: TokenStream):
+        self._stream = stream
+        self._symbols = stream.symbols
+        self._last_index = len(stream) - 1
+        self._index = 0
+        self._current = Symbol.Nothing
+
+    def mark(self) -> int:
+        return self._index
+
+    def reset(self, mark: int):
+        self._index = mark
+        self._current = self._symbols[mark]
+
+    # Lexer compatible names
+    backup_state = mark
+    restore_state = reset
+
+    def peek(self, distance: int = 1) -> Symbol:
+        """ Symbol distance tokens ahead of the current one, without moving the cursor """
+        return self._symbols[min(self._index + distance, self._last_index)]
+
+    @property
+    def current(self) -> Symbol:
+        return self._current
+
+    @property
+    def line_number(self):
+        return self._stream.lines[self._index]
+
+    @property
+    def current_identifier(self) -> str:
+        return self._stream.identifiers[self._index]
+
+    @property
+    def current_string(self) -> str:
+        return self._stream.strings[self._index]
+
+    @property
+    def current_number(self):
+        return self._stream.numbers[self._index]
+
+    @property
+    def token_count(self) -> int:
+        """ Number of tokens in the input, including the final EOF """
+        return self._last_index
+
+    def next_symbol(self):
+        i = self._index
+        if i < self._last_index:
+            i += 1
+            self._index = i
+        self._current = self._symbols[i]
+
+
+class TokenStreamLexer(TokenCursor):
+    """ Drop-in replacement for Lexer.
+    The whole input is tokenized up front, next_symbol only moves the cursor through the token arrays """
+
+    def __init__(self, input_string: str):
+        super().__init__(TokenStream(input_string))
@@ -3,7 +3,9 @@ from typing import List, Optional, Sequence, Iterable, TYPE_CHECKING
 
 from codegen_helpers import CodeSnippet, generate_prolog, gen_load_store_instruction, _gen_address_of_str, offsetof, \
     _gen_address_of_variable
+from instructions import Instruction, Opcode, Imm16, LabelRef
 from optimizer import peephole_optimize
+from pass_timer import PassTimer, timed
 from symbols import Constant, FunctionSignature, Variable, Type
 
 if TYPE_CHECKING:
@@ -41,8 +43,13 @@ class AstNode:
     def __init__(self, line_no):
         self.line_no = line_no
         self._scope: Optional[str] = None  # if none, goes to parent
-        self.parent: Optional["AstNode"] = None
+        self._parent: Optional["AstNode"] = None
         self._symbol_table: Optional["SymbolTable"] = None
+        # scope and symbol table inherited from parents, resolved on first use and dropped when the node moves
+        self._resolved_scope: Optional[str] = None
+        self._resolved_symbol_table: Optional["SymbolTable"] = None
+        # Used by AstOptimizer: size of the subtree if it was checked and nothing changed since, otherwise 0
+        self._clean_subtree_size = 0
 
     def set_parents(self, recursive=True):
         """ Recursively set parent relations starting from this node.
@@ -53,29 +60,55 @@ class AstNode:
             if recursive:
                 child.set_parents()
 
+    @property
+    def parent(self) -> Optional["AstNode"]:
+        return self._parent
+
+    @parent.setter
+    def parent(self, p: Optional["AstNode"]):
+        if p is not self._parent:
+            self._parent = p
+            self._drop_resolved()
+
+    def _drop_resolved(self):
+        """ Drops the inherited scope and symbol table of this subtree.
+        Children resolve them through this node, so if it has nothing cached, neither have they """
+        if self._resolved_scope is None and self._resolved_symbol_table is None:
+            return
+        self._resolved_scope = None
+        self._resolved_symbol_table = None
+        for child in self.children():
+            child._drop_resolved()
+
+    def _drop_resolved_in_children(self):
+        for child in self.children():
+            child._drop_resolved()
+
     @property
     def scope(self) -> str:
         if self._scope is not None:
             return self._scope
-        if self.parent is not None:
-            return self.parent.scope
-        return ""
+        if self._resolved_scope is None:
+            self._resolved_scope = self._parent.scope if self._parent is not None else ""
+        return self._resolved_scope
 
     @scope.setter
     def scope(self, s: Optional[str]):
         self._scope = s
+        self._drop_resolved_in_children()
 
     @property
     def symbol_table(self) -> Optional["SymbolTable"]:
         if self._symbol_table is not None:
             return self._symbol_table
-        if self.parent is not None:
-            return self.parent.symbol_table
-        return None
+        if self._resolved_symbol_table is None and self._parent is not None:
+            self._resolved_symbol_table = self._parent.symbol_table
+        return self._resolved_symbol_table
 
     @symbol_table.setter
     def symbol_table(self, s: Optional["SymbolTable"]):
         self._symbol_table = s
+        self._drop_resolved_in_children()
 
     def print(self, lvl):
         pass
@@ -97,6 +130,10 @@ class AstNode:
         raise NotImplementedError(f"Replace not implemented in {self.__class__.__name__}")
 
     def optimize(self) -> bool:
+        """ One whole tree pass of local rewrites, returns True if anything changed.
+        Prefer ast_optimizer.AstOptimizer, which does not revisit unchanged subtrees """
+        if self._optimize_node():
+            return True
         opt = False
         for child in self.children():
             o = child.optimize()
@@ -105,6 +142,12 @@ class AstNode:
         self.set_parents()
         return opt
 
+    def _optimize_node(self) -> bool:
+        """ Local rewrite of this node: replace it in parent or modify it in place and return True.
+        Must not depend on anything else than this node's subtree.
+        Children are optimized separately """
+        return False
+
 
 class AbstractBlock(AstNode):
     pass
@@ -134,6 +177,15 @@ def highest_type(types: Iterable[Optional[Type]]) -> Type:
     return ht
 
 
+_BIT_OPERATIONS = {
+    BinOpType.BitAnd: lambda a, b: a & b,
+    BinOpType.BitOr: lambda a, b: a | b,
+    BinOpType.BitXor: lambda a, b: a ^ b,
+    BinOpType.Lsh: lambda a, b: a << b,
+    BinOpType.Rsh: lambda a, b: a >> b,
+}
+
+
 class BinaryOperation(AbstractExpression):
     def __init__(self, line_no, op: BinOpType):
         super().__init__(line_no)
@@ -164,39 +216,39 @@ class BinaryOperation(AbstractExpression):
 
     def _gen_operation_code(self, target_type) -> CodeSnippet:
         if self.op == BinOpType.Add:
-            return CodeSnippet(self.line_no, "ADD" if target_type == Type.Byte else "ADD16", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.ADD if target_type == Type.Byte else Opcode.ADD16), target_type)
         elif self.op == BinOpType.Sub:
-            return CodeSnippet(self.line_no, "SUB2" if target_type == Type.Byte else "SUB216", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.SUB2 if target_type == Type.Byte else Opcode.SUB216), target_type)
         elif self.op == BinOpType.Mul:
-            return CodeSnippet(self.line_no, "MUL" if target_type == Type.Byte else "MUL16", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.MUL if target_type == Type.Byte else Opcode.MUL16), target_type)
         elif self.op == BinOpType.Div:
-            return CodeSnippet(self.line_no, "DIV2" if target_type == Type.Byte else "DIV216", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.DIV2 if target_type == Type.Byte else Opcode.DIV216), target_type)
         elif self.op == BinOpType.Equals:
-            return CodeSnippet(self.line_no, "EQ" if target_type == Type.Byte else "EQ16", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.EQ if target_type == Type.Byte else Opcode.EQ16), target_type)
         elif self.op == BinOpType.NotEqual:
-            return CodeSnippet(self.line_no, "NE" if target_type == Type.Byte else "NE16", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.NE if target_type == Type.Byte else Opcode.NE16), target_type)
         elif self.op == BinOpType.Le:  # inverse because of order on stack
-            return CodeSnippet(self.line_no, "GREATER_OR_EQ" if target_type == Type.Byte else "GREATER_OR_EQ16", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.GREATER_OR_EQ if target_type == Type.Byte else Opcode.GREATER_OR_EQ16), target_type)
         elif self.op == BinOpType.Lt:
-            return CodeSnippet(self.line_no, "GREATER" if target_type == Type.Byte else "GREATER16", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.GREATER if target_type == Type.Byte else Opcode.GREATER16), target_type)
         elif self.op == BinOpType.Ge:
-            return CodeSnippet(self.line_no, "LESS_OR_EQ" if target_type == Type.Byte else "LESS_OR_EQ16", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.LESS_OR_EQ if target_type == Type.Byte else Opcode.LESS_OR_EQ16), target_type)
         elif self.op == BinOpType.Gt:
-            return CodeSnippet(self.line_no, "LESS" if target_type == Type.Byte else "LESS16", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.LESS if target_type == Type.Byte else Opcode.LESS16), target_type)
         elif self.op == BinOpType.BitAnd:
-            return CodeSnippet(self.line_no, "AND" if target_type == Type.Byte else "AND16", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.AND if target_type == Type.Byte else Opcode.AND16), target_type)
         elif self.op == BinOpType.BitOr:
-            return CodeSnippet(self.line_no, "OR" if target_type == Type.Byte else "OR16", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.OR if target_type == Type.Byte else Opcode.OR16), target_type)
         elif self.op == BinOpType.BitXor:
-            return CodeSnippet(self.line_no, "XOR" if target_type == Type.Byte else "XOR16", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.XOR if target_type == Type.Byte else Opcode.XOR16), target_type)
         elif self.op == BinOpType.Mod:
-            cs = CodeSnippet(self.line_no, "SWAP" if target_type == Type.Byte else "SWAP16", target_type)
-            cs.add_line("MOD" if target_type == Type.Byte else "MOD16")
+            cs = CodeSnippet(self.line_no, Instruction(Opcode.SWAP if target_type == Type.Byte else Opcode.SWAP16), target_type)
+            cs.add_line(Instruction(Opcode.MOD if target_type == Type.Byte else Opcode.MOD16))
             return cs
         elif self.op == BinOpType.Lsh:
-            return CodeSnippet(self.line_no, "LSH" if target_type == Type.Byte else "LSH16", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.LSH if target_type == Type.Byte else Opcode.LSH16), target_type)
         elif self.op == BinOpType.Rsh:
-            return CodeSnippet(self.line_no, "RSH" if target_type == Type.Byte else "RSH16", target_type)
+            return CodeSnippet(self.line_no, Instruction(Opcode.RSH if target_type == Type.Byte else Opcode.RSH16), target_type)
 
     def replace_child(self, old: "AstNode", new: "AstNode"):
         if old == self.operand1:
@@ -205,6 +257,15 @@ class BinaryOperation(AbstractExpression):
             self.operand2 = new
         self.set_parents(False)
 
+    def _optimize_node(self) -> bool:
+        # bit operations, the others have own classes
+        fold = _BIT_OPERATIONS.get(self.op)
+        if fold and isinstance(self.operand1, Number) and isinstance(self.operand2, Number):
+            new_node = self.operand1.combine(self.operand2, fold(self.operand1.value, self.operand2.value) & 0xFFFF)
+            self.parent.replace_child(self, new_node)
+            return True
+        return False
+
     def last_used_array(self) -> Optional["VariableUsageRHS"]:
         if isinstance(self.operand2, VariableUsageRHS) and self.operand2.definition.is_array:
             return self.operand2
@@ -238,10 +299,15 @@ class UnaryOperation(AbstractExpression):
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
         c1 = self.operand.gen_code(type_hint)
         if self.op == UnOpType.BitNegate:
-            c2 = CodeSnippet(self.line_no, "FLIP" if c1.type == Type.Byte else "FLIP16", c1.type)
+            c2 = CodeSnippet(self.line_no, Instruction(Opcode.FLIP if c1.type == Type.Byte else Opcode.FLIP16), c1.type)
             return CodeSnippet.join((c1, c2), c1.type)
         elif self.op == UnOpType.UnaryMinus:
-            c2 = CodeSnippet(self.line_no, "NEG" if c1.type == Type.Byte else "NEG16", c1.type)
+            if c1.type == Type.Byte:
+                c2 = CodeSnippet(self.line_no, Instruction(Opcode.NEG), c1.type)
+            else:
+                # no 16-bit NEG in VM, use two's complement
+                c2 = CodeSnippet(self.line_no, Instruction(Opcode.FLIP16), c1.type)
+                c2.add_line(Instruction(Opcode.INC16))
             return CodeSnippet.join((c1, c2), c1.type)
         return c1
 
@@ -266,9 +332,9 @@ class LogicalOperation(BinaryOperation):  # eq, less etc
     def type(self) -> Optional[Type]:
         return Type.Byte
 
-    def optimize(self) -> bool:
+    def _optimize_node(self) -> bool:
         def _replace_with_bool(bool_val):
-            self.parent.replace_child(self, Number(1 if bool_val else 0, Type.Byte))
+            self.parent.replace_child(self, Number(self.line_no, 1 if bool_val else 0, Type.Byte))
             return True
 
         if isinstance(self.operand1, Number) and isinstance(self.operand2, Number):
@@ -297,7 +363,7 @@ class LogicalOperation(BinaryOperation):  # eq, less etc
             self.parent.replace_child(self, CompareToZero(self.line_no, self.operand1, False))
             return True
         else:
-            return super().optimize()
+            return False
 
 
 class CompareToZero(UnaryOperation):
@@ -308,10 +374,10 @@ class CompareToZero(UnaryOperation):
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
         c1 = self.operand.gen_code(type_hint)
         if self.eq:
-            code = "ZERO" if c1.type == Type.Byte else "ZERO16"
+            code = Opcode.ZERO if c1.type == Type.Byte else Opcode.ZERO16
         else:
-            code = "NZERO" if c1.type == Type.Byte else "NZERO16"
-        return CodeSnippet.join((c1, CodeSnippet(self.line_no, code, Type.Byte)), Type.Byte)  # logical ops are always 8bit
+            code = Opcode.NZERO if c1.type == Type.Byte else Opcode.NZERO16
+        return CodeSnippet.join((c1, CodeSnippet(self.line_no, Instruction(code), Type.Byte)), Type.Byte)  # logical ops are always 8bit
 
     def find_max_type(self) -> Optional[Type]:
         return Type.Byte
@@ -320,12 +386,18 @@ class CompareToZero(UnaryOperation):
     def type(self) -> Optional[Type]:
         return Type.Byte
 
+    def _optimize_node(self) -> bool:
+        if isinstance(self.operand, Number):
+            self.parent.replace_child(self, Number(self.line_no, 1 if self.operand.is_zero == self.eq else 0, Type.Byte))
+            return True
+        return False
+
 
 class SumOperation(BinaryOperation):
     def __init__(self, line_no):
         super().__init__(line_no, BinOpType.Add)
 
-    def optimize(self) -> bool:
+    def _optimize_node(self) -> bool:
         if isinstance(self.operand1, Number) and isinstance(self.operand2, Number):
             new_node = self.operand1.combine(self.operand2, self.operand1.value + self.operand2.value)
             self.parent.replace_child(self, new_node)
@@ -343,14 +415,14 @@ class SumOperation(BinaryOperation):
             self.parent.replace_child(self, AddConstant(self.line_no, self.operand1, self.operand2))
             return True
         else:
-            return super().optimize()
+            return False
 
 
 class SubtractOperation(BinaryOperation):
     def __init__(self, line_no):
         super().__init__(line_no, BinOpType.Sub)
 
-    def optimize(self) -> bool:
+    def _optimize_node(self) -> bool:
         if isinstance(self.operand1, Number) and isinstance(self.operand2, Number):
             new_node = self.operand1.combine(self.operand2, self.operand1.value - self.operand2.value)
             self.parent.replace_child(self, new_node)
@@ -368,7 +440,7 @@ class SubtractOperation(BinaryOperation):
             self.parent.replace_child(self, SubtractConstant(self.line_no, self.operand1, self.operand2))
             return True
         else:
-            return super().optimize()
+            return False
 
 
 class AddConstant(UnaryOperation):
@@ -385,10 +457,10 @@ class AddConstant(UnaryOperation):
         c1 = self.operand.gen_code(target_type)
         c1.cast(target_type)
         if self.value.is_one:
-            c2 = CodeSnippet(self.line_no, "INC" if target_type == Type.Byte else "INC16", target_type)
+            c2 = CodeSnippet(self.line_no, Instruction(Opcode.INC if target_type == Type.Byte else Opcode.INC16), target_type)
         else:
             c2 = CodeSnippet(self.line_no,
-                f"ADDC {self.value.value}" if target_type == Type.Byte else f"ADD16C #{self.value.value}",
+                Instruction(Opcode.ADDC, self.value.value) if target_type == Type.Byte else Instruction(Opcode.ADD16C, Imm16(self.value.value)),
                 target_type)
         return CodeSnippet.join((c1, c2), target_type)
 
@@ -407,12 +479,12 @@ class AddConstant(UnaryOperation):
             self.operand = new
         self.set_parents(False)
 
-    def optimize(self) -> bool:
+    def _optimize_node(self) -> bool:
         if isinstance(self.operand, Number):
             self.parent.replace_child(self, self.operand.combine(self.value, self.operand.value + self.value.value))
             return True
         else:
-            return super().optimize()
+            return False
 
 
 class SubtractConstant(UnaryOperation):
@@ -429,10 +501,10 @@ class SubtractConstant(UnaryOperation):
         c1 = self.operand.gen_code(target_type)
         c1.cast(target_type)
         if self.value.is_one:
-            c2 = CodeSnippet(self.line_no, "DEC" if target_type == Type.Byte else "DEC16", target_type)
+            c2 = CodeSnippet(self.line_no, Instruction(Opcode.DEC if target_type == Type.Byte else Opcode.DEC16), target_type)
         else:
             c2 = CodeSnippet(self.line_no,
-                f"SUBC {self.value.value}" if target_type == Type.Byte else f"SUB16C #{self.value.value}",
+                Instruction(Opcode.SUBC, self.value.value) if target_type == Type.Byte else Instruction(Opcode.SUB16C, Imm16(self.value.value)),
                 target_type)
         return CodeSnippet.join((c1, c2), target_type)
 
@@ -451,12 +523,12 @@ class SubtractConstant(UnaryOperation):
             self.operand = new
         self.set_parents(False)
 
-    def optimize(self) -> bool:
+    def _optimize_node(self) -> bool:
         if isinstance(self.operand, Number):
             self.parent.replace_child(self, self.operand.combine(self.value, self.operand.value - self.value.value))
             return True
         else:
-            return super().optimize()
+            return False
 
 
 class MulConstant(UnaryOperation):
@@ -469,10 +541,10 @@ class MulConstant(UnaryOperation):
         c1 = self.operand.gen_code(target_type)
         c1.cast(target_type)
         if self.value.value == 2:
-            c2 = CodeSnippet(self.line_no, "MACRO_X2" if target_type == Type.Byte else "MACRO_X216", target_type)
+            c2 = CodeSnippet(self.line_no, Instruction(Opcode.MACRO_X2 if target_type == Type.Byte else Opcode.MACRO_X216), target_type)
         else:
             c2 = CodeSnippet(self.line_no,
-                f"MULC {self.value.value}" if target_type == Type.Byte else f"MUL16C #{self.value.value}",
+                Instruction(Opcode.MULC, self.value.value) if target_type == Type.Byte else Instruction(Opcode.MUL16C, Imm16(self.value.value)),
                 target_type)
         return CodeSnippet.join((c1, c2), target_type)
 
@@ -491,19 +563,19 @@ class MulConstant(UnaryOperation):
             self.operand = new
         self.set_parents(False)
 
-    def optimize(self) -> bool:
+    def _optimize_node(self) -> bool:
         if isinstance(self.operand, Number):
             self.parent.replace_child(self, self.operand.combine(self.value, self.operand.value * self.value.value))
             return True
         else:
-            return super().optimize()
+            return False
 
 
 class MultiplyOperation(BinaryOperation):
     def __init__(self, line_no):
         super().__init__(line_no, BinOpType.Mul)
 
-    def optimize(self) -> bool:
+    def _optimize_node(self) -> bool:
         if isinstance(self.operand1, Number) and isinstance(self.operand2, Number):
             new_node = self.operand1.combine(self.operand2, self.operand1.value * self.operand2.value)
             self.parent.replace_child(self, new_node)
@@ -525,14 +597,14 @@ class MultiplyOperation(BinaryOperation):
             self.parent.replace_child(self, MulConstant(self.line_no, self.operand1, self.operand2))
             return True
         else:
-            return super().optimize()
+            return False
 
 
 class DivisionOperation(BinaryOperation):
     def __init__(self, line_no):
         super().__init__(line_no, BinOpType.Div)
 
-    def optimize(self) -> bool:
+    def _optimize_node(self) -> bool:
         if isinstance(self.operand2, Number) and self.operand2.is_zero:
             raise ValueError(f"Division by zero detected in line {self.line_no}")
         if isinstance(self.operand1, Number) and isinstance(self.operand2, Number):
@@ -542,8 +614,41 @@ class DivisionOperation(BinaryOperation):
         elif isinstance(self.operand1, Number) and self.operand1.is_zero:
             self.parent.replace_child(self, self.operand1)
             return True
+        elif isinstance(self.operand2, Number) and self.operand2.is_one:
+            self.parent.replace_child(self, self.operand1)
+            return True
+        elif isinstance(self.operand2, Number) and self.operand2.power_of_two and not (
+                self.operand2.value == 2 and self.type == Type.Byte):  # 8-bit division by 2 has MACRO_DIV2
+            # unsigned division by 2^k is a right shift, it costs the same and skips division by zero check
+            shift = BinaryOperation(self.line_no, BinOpType.Rsh)
+            shift.operand1 = self.operand1
+            shift.operand2 = Number(self.line_no, self.operand2.power_of_two, self.operand2.type)
+            self.parent.replace_child(self, shift)
+            return True
         else:
-            return super().optimize()
+            return False
+
+
+class ModuloOperation(BinaryOperation):
+    def __init__(self, line_no):
+        super().__init__(line_no, BinOpType.Mod)
+
+    def _optimize_node(self) -> bool:
+        if isinstance(self.operand2, Number) and self.operand2.is_zero:
+            raise ValueError(f"Division by zero detected in line {self.line_no}")
+        if isinstance(self.operand1, Number) and isinstance(self.operand2, Number):
+            new_node = self.operand1.combine(self.operand2, self.operand1.value % self.operand2.value)
+            self.parent.replace_child(self, new_node)
+            return True
+        elif isinstance(self.operand2, Number) and self.operand2.power_of_two is not None:
+            # unsigned x % 2^k is x & (2^k - 1): one instruction less than SWAP, MOD and much faster in VM
+            mask = BinaryOperation(self.line_no, BinOpType.BitAnd)
+            mask.operand1 = self.operand1
+            mask.operand2 = Number(self.line_no, self.operand2.value - 1, self.operand2.type)
+            self.parent.replace_child(self, mask)
+            return True
+        else:
+            return False
 
 
 class LogicalChainOperation(BinaryOperation):  # AND, OR
@@ -552,18 +657,21 @@ class LogicalChainOperation(BinaryOperation):  # AND, OR
         self.condition_counter = condition_counter
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
-        jmp = "JT" if self.op == BinOpType.LogicalOr else "JF"
-        comp2 = "OR" if self.op == BinOpType.LogicalOr else "AND"
         c1 = self.operand1.gen_code(type_hint)
-        suffix = "" if c1.type == Type.Byte else "16"
-        code_dup = f"DUP{suffix}"
-        code_jmp = f"{jmp}{suffix} @cond{self.condition_counter}_expr_end"
-        c2 = CodeSnippet(self.line_no, code_dup)
-        c2.add_line(code_jmp)
+        if c1.type == Type.Byte:
+            jmp = Opcode.JT if self.op == BinOpType.LogicalOr else Opcode.JF
+            comp2 = Opcode.OR if self.op == BinOpType.LogicalOr else Opcode.AND
+            dup = Opcode.DUP
+        else:
+            jmp = Opcode.JT16 if self.op == BinOpType.LogicalOr else Opcode.JF16
+            comp2 = Opcode.OR16 if self.op == BinOpType.LogicalOr else Opcode.AND16
+            dup = Opcode.DUP16
+        c2 = CodeSnippet(self.line_no, Instruction(dup))
+        c2.add_line(Instruction(jmp, LabelRef(f"cond{self.condition_counter}_expr_end")))
         c3 = self.operand2.gen_code(type_hint)
-        c3.add_line(comp2 + suffix)
+        c3.add_line(Instruction(comp2))
         if self.parent and not isinstance(self.parent, LogicalChainOperation):
-            c3.add_line(f":cond{self.condition_counter}_expr_end")
+            c3.add_line(Instruction(Opcode.LABEL, f"cond{self.condition_counter}_expr_end"))
         return CodeSnippet.join((c1, c2, c3), self.type)
 
     @property
@@ -587,15 +695,15 @@ class Number(AbstractExpression):
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
         if self.type == Type.Byte:
             if type_hint == Type.Addr:
-                sn = CodeSnippet(self.line_no, f"PUSH16 #{self.value}", Type.Addr)
+                sn = CodeSnippet(self.line_no, Instruction(Opcode.PUSH16, Imm16(self.value)), Type.Addr)
             else:
-                sn = CodeSnippet(self.line_no, f"PUSH {self.value}", Type.Byte)
+                sn = CodeSnippet(self.line_no, Instruction(Opcode.PUSH, self.value), Type.Byte)
         else:
             if type_hint == Type.Byte:
                 val = self.value if self.value <= 255 else 255
-                sn = CodeSnippet(self.line_no, f"PUSH {val}", Type.Byte)
+                sn = CodeSnippet(self.line_no, Instruction(Opcode.PUSH, val), Type.Byte)
             else:
-                sn = CodeSnippet(self.line_no, f"PUSH16 #{self.value}", Type.Addr)
+                sn = CodeSnippet(self.line_no, Instruction(Opcode.PUSH16, Imm16(self.value)), Type.Addr)
         return sn
 
     def find_max_type(self) -> Optional[Type]:
@@ -609,6 +717,13 @@ class Number(AbstractExpression):
     def is_one(self):
         return self.value == 1
 
+    @property
+    def power_of_two(self) -> Optional[int]:
+        """ k if value is 2^k, otherwise None """
+        if isinstance(self.value, int) and self.value > 0 and self.value & (self.value - 1) == 0:
+            return self.value.bit_length() - 1
+        return None
+
     def combine(self, another: "Number", new_value) -> "Number":
         resulting_type = highest_type((self.type, another.type))
         if new_value > 255:
@@ -636,7 +751,7 @@ class StoreAtPointer(AbstractExpression):
         self.type_ = type_
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
-        return CodeSnippet(self.line_no, "STORE_GLOBAL_PTR" if self.type_ == Type.Byte else "STORE_GLOBAL_PTR16")
+        return CodeSnippet(self.line_no, Instruction(Opcode.STORE_GLOBAL_PTR if self.type_ == Type.Byte else Opcode.STORE_GLOBAL_PTR16))
 
     @property
     def type(self) -> Optional[Type]:
@@ -692,7 +807,7 @@ class Assign(AbstractStatement):
             self.var = new
         self.set_parents(True)  # should be recursive there
 
-    def optimize(self) -> bool:
+    def _optimize_node(self) -> bool:
         if (isinstance(self.value, AddConstant)
                 and self.value.is_increment
                 and isinstance(self.value.operand, VariableUsage)
@@ -752,10 +867,10 @@ class Assign(AbstractStatement):
                         self.var = StoreAtPointer(self.line_no, self.var.definition.type)
                         self.var.parent = self
                         return True
-            return super().optimize()
+            return False
 
         else:
-            return super().optimize()
+            return False
 
 
 class IncLocal(AbstractStatement):
@@ -768,15 +883,15 @@ class IncLocal(AbstractStatement):
         vtype = self.var.definition.type if not self.var.is_array else Type.Addr
         instr = self._instr(vtype)
         return CodeSnippet(self.line_no,
-            f"{instr} {offs} ;{self.var.name}", self.var.definition.type)
+            Instruction(instr, offs, comment=self.var.name), self.var.definition.type)
 
     def _instr(self, type):
-        return "MACRO_INC_LOCAL" if type == Type.Byte else f"MACRO_INC_LOCAL16"
+        return Opcode.MACRO_INC_LOCAL if type == Type.Byte else Opcode.MACRO_INC_LOCAL16
 
 
 class DecLocal(IncLocal):
     def _instr(self, type):
-        return "MACRO_DEC_LOCAL" if type == Type.Byte else f"MACRO_DEC_LOCAL16"
+        return Opcode.MACRO_DEC_LOCAL if type == Type.Byte else Opcode.MACRO_DEC_LOCAL16
 
 
 class SetLocal(AbstractStatement):
@@ -788,9 +903,11 @@ class SetLocal(AbstractStatement):
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
         offs = offsetof(self.symbol_table, self.scope, self.var.name, False)
         vtype = self.var.definition.type if not self.var.is_array else Type.Addr
-        instr = f"MACRO_SET_LOCAL {offs} {self.value}" if vtype == Type.Byte else f"MACRO_SET_LOCAL16 {offs} #{self.value}"
-        return CodeSnippet(self.line_no,
-            f"{instr} ;{self.var.name}", self.var.definition.type)
+        if vtype == Type.Byte:
+            instr = Instruction(Opcode.MACRO_SET_LOCAL, offs, self.value, comment=self.var.name)
+        else:
+            instr = Instruction(Opcode.MACRO_SET_LOCAL16, offs, Imm16(self.value), comment=self.var.name)
+        return CodeSnippet(self.line_no, instr, self.var.definition.type)
 
 
 class VariableUsage(AbstractStatement):
@@ -865,28 +982,32 @@ class VariableUsage(AbstractStatement):
             snippets = [base_address]
             current_level = self
             while 1:
+                struct_def = current_level.definition.struct_def  # member offsets are cached in the definition
                 if current_level.array_jump:
                     if isinstance(current_level.array_jump, Number):
-                        member_offset += current_level.array_jump.value * current_level.definition.struct_def.stack_size
+                        member_offset += current_level.array_jump.value * struct_def.stack_size
                     else:
                         index_var = current_level.array_jump.gen_code(Type.Addr)
                         index_var.cast(Type.Addr)
                         snippets.append(index_var)
-                        if current_level.definition.struct_def.stack_size > 1:
-                            snippets.append(CodeSnippet(self.line_no, f"MUL16C #{current_level.definition.stack_size_single_element}", Type.Addr))
-                        snippets.append(CodeSnippet(self.line_no, "ADD16", Type.Addr))
+                        if struct_def.stack_size > 1:
+                            snippets.append(CodeSnippet(self.line_no, Instruction(Opcode.MUL16C, Imm16(current_level.definition.stack_size_single_element)), Type.Addr))
+                        snippets.append(CodeSnippet(self.line_no, Instruction(Opcode.ADD16), Type.Addr))
                 if current_level.struct_child:
-                    member_offset += current_level.definition.struct_def.member_offset(current_level.struct_child.name)
+                    member_offset += struct_def.member_offset(current_level.struct_child.name)
                     current_level = current_level.struct_child
                 else:
                     last_var_type = current_level.type
                     break
             if member_offset > 0:
-                snippets.append(CodeSnippet(self.line_no, f"ADD16C #{member_offset}"))
+                snippets.append(CodeSnippet(self.line_no, Instruction(Opcode.ADD16C, Imm16(member_offset))))
 
             if self._gen_struct_load_store():
-                suffix = "" if last_var_type == Type.Byte else "16"
-                snippets.append(CodeSnippet(self.line_no, f"LOAD_GLOBAL{suffix}" if self.is_load else f"STORE_GLOBAL{suffix}"))
+                if self.is_load:
+                    opcode = Opcode.LOAD_GLOBAL if last_var_type == Type.Byte else Opcode.LOAD_GLOBAL16
+                else:
+                    opcode = Opcode.STORE_GLOBAL if last_var_type == Type.Byte else Opcode.STORE_GLOBAL16
+                snippets.append(CodeSnippet(self.line_no, Instruction(opcode)))
 
             return CodeSnippet.join(snippets, last_var_type)
 
@@ -922,9 +1043,9 @@ class VariableUsage(AbstractStatement):
                 c2 = self._processed_array_jump.gen_code(Type.Addr)
                 c1 = CodeSnippet.join((c1, c2), Type.Addr)
         if self.is_load:
-            c1.add_line("LOAD_GLOBAL" if self.definition.type == Type.Byte else "LOAD_GLOBAL16")
+            c1.add_line(Instruction(Opcode.LOAD_GLOBAL if self.definition.type == Type.Byte else Opcode.LOAD_GLOBAL16))
         else:
-            c1.add_line("STORE_GLOBAL" if self.definition.type == Type.Byte else "STORE_GLOBAL16")
+            c1.add_line(Instruction(Opcode.STORE_GLOBAL if self.definition.type == Type.Byte else Opcode.STORE_GLOBAL16))
         c1.type = self.definition.type
         return c1
 
@@ -965,8 +1086,11 @@ class GroupOfStatements(AbstractStatement):
     def replace_child(self, old: "AstNode", new: "AstNode"):
         for i, s in enumerate(self.statements):
             if s == old:
-                self.statements[i] = new
-                self.set_parents(False)
+                if new is not None:
+                    self.statements[i] = new
+                    self.set_parents(False)
+                else:
+                    del self.statements[i]
                 break
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
@@ -994,11 +1118,13 @@ class Function(AbstractBlock):
         self.set_parents(False)
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
-        snippet1 = CodeSnippet(self.line_no, f":function_{self.name}\n;{self.signature}")
+        snippet1 = CodeSnippet(self.line_no, Instruction(Opcode.LABEL, f"function_{self.name}"))
+        snippet1.add_line(Instruction(Opcode.COMMENT, comment=str(self.signature)))
         snippet2 = generate_prolog(self.line_no, self.symbol_table, self.name)
         snippet3 = self.body.gen_code(None)
-        if snippet3.codes and snippet3.codes[-1] != "RET":
-            snippet3.add_line("RET")
+        last_line = snippet3.last_line
+        if last_line and last_line.opcode != Opcode.RET:
+            snippet3.add_line(Instruction(Opcode.RET))
         return CodeSnippet.join((snippet1, snippet2, snippet3))
 
 
@@ -1034,7 +1160,7 @@ class Condition(AbstractStatement):
             self.else_body = new
         self.set_parents(False)
 
-    def optimize(self) -> bool:
+    def _optimize_node(self) -> bool:
         if isinstance(self.condition, Number):
             if self.condition.is_zero:
                 if self.else_body:
@@ -1046,27 +1172,27 @@ class Condition(AbstractStatement):
             else:
                 self.parent.replace_child(self, self.if_body)
                 return True
-        return super().optimize()
+        return False
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
         snippet1 = self.condition.gen_code(self.condition.type)
         if self.else_body:
             snippet2 = CodeSnippet(self.line_no,
-                f"JF @if{self.number}_else" if self.condition.type == Type.Byte else f"JF16 @if{self.number}_else")
+                Instruction(Opcode.JF if self.condition.type == Type.Byte else Opcode.JF16, LabelRef(f"if{self.number}_else")))
         else:
             snippet2 = CodeSnippet(self.line_no,
-                f"JF @if{self.number}_endif" if self.condition.type == Type.Byte else f"JF16 @if{self.number}_endif")
+                Instruction(Opcode.JF if self.condition.type == Type.Byte else Opcode.JF16, LabelRef(f"if{self.number}_endif")))
         snippet3 = self.if_body.gen_code(type_hint)
         if self.else_body:
-            snippet3.add_line(f"JMP @if{self.number}_endif")
+            snippet3.add_line(Instruction(Opcode.JMP, LabelRef(f"if{self.number}_endif")))
         snippets = [snippet1, snippet2, snippet3]
 
         if self.else_body:
-            snippet3.add_line(f":if{self.number}_else")
+            snippet3.add_line(Instruction(Opcode.LABEL, f"if{self.number}_else"))
             snippet4 = self.else_body.gen_code(type_hint)
             snippets.append(snippet4)
         ret = CodeSnippet.join(snippets, type_hint)
-        ret.add_line(f":if{self.number}_endif")
+        ret.add_line(Instruction(Opcode.LABEL, f"if{self.number}_endif"))
         return ret
 
 
@@ -1095,28 +1221,29 @@ class WhileLoop(AbstractStatement):
             self.body = new
         self.set_parents(False)
 
-    def optimize(self) -> bool:
+    def _optimize_node(self) -> bool:
         if isinstance(self.condition, Number):
             if self.condition.is_zero:
                 self.parent.replace_child(self, None)
                 return True
             else:
+                # infinite loop, in place change only: the body is still optimized
                 self.condition = Dummy(self.line_no)
-                self.condition.set_parents(False)
+                self.set_parents(False)
                 return False
-        return super().optimize()
+        return False
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
-        snippet1 = CodeSnippet(self.line_no, f":while{self.number}_begin")
+        snippet1 = CodeSnippet(self.line_no, Instruction(Opcode.LABEL, f"while{self.number}_begin"))
         snippet2 = self.condition.gen_code(self.condition.type)
         if not isinstance(self.condition, Dummy):
             snippet3 = CodeSnippet(self.line_no,
-                f"JF @while{self.number}_endwhile" if self.condition.type == Type.Byte else f"JF16 @while{self.number}_endwhile")
+                Instruction(Opcode.JF if self.condition.type == Type.Byte else Opcode.JF16, LabelRef(f"while{self.number}_endwhile")))
         else:
             snippet3 = CodeSnippet(self.line_no)
         snippet4 = self.body.gen_code(type_hint)
-        snippet4.add_line(f"JMP @while{self.number}_begin")
-        snippet4.add_line(f":while{self.number}_endwhile")
+        snippet4.add_line(Instruction(Opcode.JMP, LabelRef(f"while{self.number}_begin")))
+        snippet4.add_line(Instruction(Opcode.LABEL, f"while{self.number}_endwhile"))
         return CodeSnippet.join((snippet1, snippet2, snippet3, snippet4))
 
 
@@ -1144,20 +1271,20 @@ class DoWhileLoop(AbstractStatement):
             self.body = new
         self.set_parents(False)
 
-    def optimize(self) -> bool:
+    def _optimize_node(self) -> bool:
         if isinstance(self.condition, Number):
             if self.condition.is_zero:
                 self.parent.replace_child(self, self.body)
                 return True
-        return super().optimize()
+        return False
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
-        snippet1 = CodeSnippet(self.line_no, f":while{self.number}_begin")
+        snippet1 = CodeSnippet(self.line_no, Instruction(Opcode.LABEL, f"while{self.number}_begin"))
         snippet2 = self.body.gen_code(type_hint)
         snippet3 = self.condition.gen_code(self.condition.type)
         snippet4 = CodeSnippet(self.line_no,
-            f"JT @while{self.number}_begin" if self.condition.type == Type.Byte else f"JT16 @while{self.number}_begin")
-        snippet4.add_line(f":while{self.number}_endwhile")
+            Instruction(Opcode.JT if self.condition.type == Type.Byte else Opcode.JT16, LabelRef(f"while{self.number}_begin")))
+        snippet4.add_line(Instruction(Opcode.LABEL, f"while{self.number}_endwhile"))
         return CodeSnippet.join((snippet1, snippet2, snippet3, snippet4))
 
 
@@ -1172,7 +1299,7 @@ class Instruction_PrintStringConstant(AbstractStatement):
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
         c1 = _gen_address_of_str(self.line_no, self.symbol_table, self.content)
-        c1.add_line("SYSCALL Std.PrintString")
+        c1.add_line(Instruction(Opcode.SYSCALL, "Std.PrintString"))
         return c1
 
 
@@ -1196,7 +1323,7 @@ class Instruction_PrintStringByPointer(AbstractStatement):
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
         c1 = self.expr.gen_code(Type.Addr)
         c1.cast(Type.Addr)
-        c1.add_line("SYSCALL Std.PrintString")
+        c1.add_line(Instruction(Opcode.SYSCALL, "Std.PrintString"))
         return c1
 
 
@@ -1215,11 +1342,11 @@ class Instruction_PrintInteger(AbstractStatement):
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
         c = self.expr.gen_code(type_hint)
         if c.type == Type.Byte or c.type is None:
-            c.add_line("SYSCALL Std.PrintInt")
-            c.add_line("POP")
+            c.add_line(Instruction(Opcode.SYSCALL, "Std.PrintInt"))
+            c.add_line(Instruction(Opcode.POP))
         else:
-            c.add_line("SYSCALL Std.PrintInt16")
-            c.add_line("POPN 2")
+            c.add_line(Instruction(Opcode.SYSCALL, "Std.PrintInt16"))
+            c.add_line(Instruction(Opcode.POPN, 2))
         return c
 
     def replace_child(self, old: "AstNode", new: "AstNode"):
@@ -1248,7 +1375,7 @@ class Instruction_PrintChar(AbstractStatement):
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
         c = self.expr.gen_code(Type.Byte)
         c.cast(Type.Byte)
-        c.add_line("SYSCALL Std.PrintCharPop")
+        c.add_line(Instruction(Opcode.SYSCALL, "Std.PrintCharPop"))
         return c
 
 
@@ -1257,7 +1384,7 @@ class Instruction_PrintNewLine(AbstractStatement):
         self._print_indented(lvl, "newline")
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
-        return CodeSnippet(self.line_no, "SYSCALL Std.PrintNewLine")
+        return CodeSnippet(self.line_no, Instruction(Opcode.SYSCALL, "Std.PrintNewLine"))
 
 
 class Instruction_Halt(AbstractStatement):
@@ -1265,7 +1392,7 @@ class Instruction_Halt(AbstractStatement):
         self._print_indented(lvl, "halt")
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
-        return CodeSnippet(self.line_no, "HALT")
+        return CodeSnippet(self.line_no, Instruction(Opcode.HALT))
 
 
 class Instruction_Debugger(AbstractStatement):
@@ -1273,7 +1400,7 @@ class Instruction_Debugger(AbstractStatement):
         self._print_indented(lvl, "debugger")
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
-        return CodeSnippet(self.line_no, "debugger")
+        return CodeSnippet(self.line_no, Instruction(Opcode.DEBUGGER))
 
 
 class Instruction_Continue(AbstractStatement):
@@ -1285,7 +1412,7 @@ class Instruction_Continue(AbstractStatement):
         self._print_indented(lvl, "continue")
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
-        return CodeSnippet(self.line_no, f"JMP @while{self.loop_no}_begin")
+        return CodeSnippet(self.line_no, Instruction(Opcode.JMP, LabelRef(f"while{self.loop_no}_begin")))
 
 
 class Instruction_Break(AbstractStatement):
@@ -1297,7 +1424,7 @@ class Instruction_Break(AbstractStatement):
         self._print_indented(lvl, "break")
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
-        return CodeSnippet(self.line_no, f"JMP @while{self.loop_no}_endwhile")
+        return CodeSnippet(self.line_no, Instruction(Opcode.JMP, LabelRef(f"while{self.loop_no}_endwhile")))
 
 
 class FunctionCall(AbstractStatement):
@@ -1331,7 +1458,10 @@ class FunctionCall(AbstractStatement):
         return_value = self.signature.return_value
 
         if self.signature.return_value:
-            s = CodeSnippet(self.line_no, "PUSH 0 ; rv" if not return_value.is_16bit else "PUSHN 2 ; rv")
+            if not return_value.is_16bit:
+                s = CodeSnippet(self.line_no, Instruction(Opcode.PUSH, 0, comment="rv"))
+            else:
+                s = CodeSnippet(self.line_no, Instruction(Opcode.PUSHN, 2, comment="rv"))
             snippets.append(s)
 
         refs_mapping = {}
@@ -1348,7 +1478,7 @@ class FunctionCall(AbstractStatement):
                 refs_mapping[arg_def] = arg.name
             snippets.append(s)
 
-        snippets.append(CodeSnippet(self.line_no, f"CALL @function_{self.name}"))
+        snippets.append(CodeSnippet(self.line_no, Instruction(Opcode.CALL, LabelRef(f"function_{self.name}"))))
 
         pop_count = 0
         for name, arg in reversed(self.signature.args.items()):
@@ -1361,13 +1491,13 @@ class FunctionCall(AbstractStatement):
                     pop_count += 1 if not return_value.is_16bit else 2
 
                 if pop_count > 0:
-                    snippets.append(CodeSnippet(self.line_no, f"POPN {pop_count}"))
+                    snippets.append(CodeSnippet(self.line_no, Instruction(Opcode.POPN, pop_count)))
                     pop_count = 0
                 if arg != return_value:
                     snippets.append(gen_load_store_instruction(self.line_no, self.symbol_table, self.scope, refs_mapping[arg], False))
 
         if pop_count > 0:
-            snippets.append(CodeSnippet(self.line_no, f"POPN {pop_count}"))
+            snippets.append(CodeSnippet(self.line_no, Instruction(Opcode.POPN, pop_count)))
 
         return CodeSnippet.join(snippets)
 
@@ -1397,11 +1527,11 @@ class FunctionReturn(AbstractStatement):
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
         if self.value is None:
-            return CodeSnippet(self.line_no, "RET")
+            return CodeSnippet(self.line_no, Instruction(Opcode.RET))
         snippet1 = self.value.gen_code(self.return_type)
         snippet1.cast(self.return_type)
         snippet2 = gen_load_store_instruction(self.line_no, self.symbol_table, self.scope, FunctionSignature.RETURN_VALUE_NAME, False)
-        snippet2.add_line("RET")
+        snippet2.add_line(Instruction(Opcode.RET))
         return CodeSnippet.join((snippet1, snippet2), self.return_type)
 
 
@@ -1437,7 +1567,7 @@ class ArrayInitialization_StackAlloc(ArrayInitializationStatement):
             self.set_parents(False)
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
-        c1 = CodeSnippet(self.line_no, "PUSH_REG 1")
+        c1 = CodeSnippet(self.line_no, Instruction(Opcode.PUSH_REG, 1))
         c2 = gen_load_store_instruction(self.line_no, self.symbol_table, self.scope, self.definition.name, False)
         c3 = self.length.gen_code(type_hint)
         c3.cast(Type.Byte)  # limitation of PUSHN2
@@ -1446,15 +1576,15 @@ class ArrayInitialization_StackAlloc(ArrayInitializationStatement):
                 tmp = Number(self.line_no,  self.length.value * 2, Type.Byte)
                 c3 = tmp.gen_code(Type.Byte)
             else:
-                c3.add_line("MULC 2")
-        return CodeSnippet.join((c1, c2, c3, CodeSnippet(self.line_no, "PUSHN2")))
+                c3.add_line(Instruction(Opcode.MULC, 2))
+        return CodeSnippet.join((c1, c2, c3, CodeSnippet(self.line_no, Instruction(Opcode.PUSHN2))))
 
-    def optimize(self) -> bool:
+    def _optimize_node(self) -> bool:
         if isinstance(self.length, Number) and self.length.is_zero:
             self.parent.replace_child(self, None)
             return True
         else:
-            return super().optimize()
+            return False
 
 
 class ArrayInitialization_InitializerList(ArrayInitializationStatement):
@@ -1470,7 +1600,7 @@ class ArrayInitialization_InitializerList(ArrayInitializationStatement):
         yield from self.elements
 
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
-        stack_pos = CodeSnippet(self.line_no, "PUSH_REG 1", type_=self.definition.type)
+        stack_pos = CodeSnippet(self.line_no, Instruction(Opcode.PUSH_REG, 1), type_=self.definition.type)
         store = gen_load_store_instruction(self.line_no, self.symbol_table, self.scope, self.definition.name, False)
         numbers = [n.gen_code(type_hint) for n in self.elements]
         return CodeSnippet.join([stack_pos, store] + numbers, self.definition.type)
@@ -1537,7 +1667,7 @@ class Syscall_GetRandomNumber(AbstractExpression):
         c1.cast(Type.Byte)
         c2 = self.upper.gen_code(Type.Byte)
         c2.cast(Type.Byte)
-        c3 = CodeSnippet(self.line_no, "SYSCALL Std.GetRandomNumber", Type.Byte)
+        c3 = CodeSnippet(self.line_no, Instruction(Opcode.SYSCALL, "Std.GetRandomNumber"), Type.Byte)
         return CodeSnippet.join((c1, c2, c3), Type.Byte)
 
     @property
@@ -1558,7 +1688,7 @@ class Syscall_GetRandomNumber(AbstractExpression):
 
 class Syscall_ReadKey(AbstractExpression):
     def gen_code(self, type_hint: Optional[Type]) -> Optional[CodeSnippet]:
-        return CodeSnippet(self.line_no, "SYSCALL Std.ReadKey", Type.Byte)
+        return CodeSnippet(self.line_no, Instruction(Opcode.SYSCALL, "Std.ReadKey"), Type.Byte)
 
     @property
     def type(self) -> Optional[Type]:
@@ -1584,7 +1714,7 @@ class NonReturningSyscall(AbstractExpression):
             c2 = self.arg2.gen_code(self.arg2_type)
             codes.append(c2)
 
-        codes.append(CodeSnippet(self.line_no, f"SYSCALL {self.call_name}"))
+        codes.append(CodeSnippet(self.line_no, Instruction(Opcode.SYSCALL, self.call_name)))
         return CodeSnippet.join(codes)
 
     def children(self) -> Sequence["AstNode"]:
@@ -1613,7 +1743,7 @@ class AstProgram(AstNode):
     def children(self):
         yield from self.blocks
 
-    def gen_code(self, optimize_assembly=True) -> Optional[CodeSnippet]:
+    def gen_code(self, optimize_assembly=True, timer: Optional[PassTimer] = None) -> Optional[CodeSnippet]:
         # Move functions to the end:
         blocks_functions = [b for b in self.blocks if isinstance(b, Function)]
         blocks_main = [b for b in self.blocks if not isinstance(b, Function)]
@@ -1621,7 +1751,7 @@ class AstProgram(AstNode):
         blocks = [b.gen_code(None) for b in blocks_main]
         program_prolog = generate_prolog(self.line_no, self.symbol_table, "")
         blocks.insert(0, program_prolog)
-        blocks.append(CodeSnippet(self.line_no, "HALT"))
+        blocks.append(CodeSnippet(self.line_no, Instruction(Opcode.HALT)))
         main_block = CodeSnippet.join(blocks)
 
         blocks = [main_block]
@@ -1630,13 +1760,14 @@ class AstProgram(AstNode):
 
         if optimize_assembly:
             for code in blocks:
-                peephole_optimize(code)
+                with timed(timer, "peephole"):
+                    peephole_optimize(code)
 
         ret = CodeSnippet.join(blocks)
 
         for i, stc in enumerate(self.symbol_table.get_all_strings()):
-            ret.add_line(f":string_{i + 1}")
-            ret.add_line(f"\"{stc}\"")
+            ret.add_line(Instruction(Opcode.LABEL, f"string_{i + 1}"))
+            ret.add_line(Instruction(Opcode.STRING, stc))
 
         return ret
 
@@ -1,142 +1,187 @@
+from typing import Optional, List, Dict, Sequence, Union, Iterable, Callable, Any
+
 from codegen_helpers import CodeSnippet
+from instructions import Opcode, Instruction, Imm16
 
+CONDITIONS = [Opcode.EQ, Opcode.NE, Opcode.LESS, Opcode.LESS_OR_EQ, Opcode.GREATER, Opcode.GREATER_OR_EQ,
+              Opcode.ZERO, Opcode.NZERO]  # order of MACRO_CONDITIONAL_JF condition codes
 
-def peephole_optimize(snippet: CodeSnippet):
-    def line_equal(j, val):
-        if j < len(snippet.codes):
-            return snippet.codes[j] == val
-        return False
+LOADS = {Opcode.LOAD_GLOBAL, Opcode.LOAD_GLOBAL16, Opcode.LOAD_LOCAL, Opcode.LOAD_LOCAL16, Opcode.LOAD_ARG,
+         Opcode.LOAD_ARG16, Opcode.LOAD_NVRAM, Opcode.LOAD_GLOBAL_PTR, Opcode.LOAD_GLOBAL_PTR16,
+         Opcode.MACRO_LOAD_GLOBAL_VAR, Opcode.MACRO_LOAD_GLOBAL_VAR16}
 
-    def line_starts_with(j, val):
-        if j < len(snippet.codes):
-            return snippet.codes[j].startswith(val)
-        return False
 
-    changes = 1
-    while changes > 0:
-        changes = 0
-        for i, line in enumerate(snippet.codes):
-            if line == "AND" and line_equal(i + 1, "EXTEND"):
-                snippet.codes[i] = "MACRO_ANDX"
-                snippet.remove_line(i + 1)
-                changes += 1
-                break
-            if line == "OR" and line_equal(i + 1, "EXTEND"):
-                snippet.codes[i] = "MACRO_ORX"
-                snippet.remove_line(i + 1)
-                changes += 1
-                break
-            if line == "EXTEND" and line_equal(i + 1, "ADD16"):
-                snippet.codes[i] = "MACRO_ADD8_TO_16"
-                snippet.remove_line(i + 1)
-                changes += 1
-                break
-            if line == "EXTEND" and line_equal(i + 1, "LSH16"):
-                snippet.codes[i] = "MACRO_LSH16_BY8"
-                snippet.remove_line(i + 1)
-                changes += 1
-                break
-            if line == "EXTEND" and line_equal(i + 1, "MACRO_X216") and line_equal(i + 2, "ADD16") and line_equal(i + 3, "LOAD_GLOBAL16") and line_starts_with(i + 4, "LOAD_LOCAL16 "):
-                variable = snippet.codes[i+4][13:]
-                snippet.codes[i] = f"MACRO_POP_EXT_X2_ADD16_LG16_LL16 {variable}"
-                snippet.remove_line(i + 4)
-                snippet.remove_line(i + 3)
-                snippet.remove_line(i + 2)
-                snippet.remove_line(i + 1)
-                changes += 1
-                break
-            if line == "EXTEND" and line_equal(i + 1, "MACRO_X216") and line_equal(i + 2, "ADD16") and line_equal(i + 3,
-                                                                                                                  "LOAD_GLOBAL16"):
-                snippet.codes[i] = "MACRO_POP_EXT_X2_ADD16_LG16"
-                snippet.remove_line(i + 3)
-                snippet.remove_line(i + 2)
-                snippet.remove_line(i + 1)
-                changes += 1
-                break
-            if line == "EXTEND" and line_equal(i + 1, "MACRO_X216") and line_equal(i + 2, "ADD16"):
-                snippet.codes[i] = "MACRO_POP_EXT_X2_ADD16"
-                snippet.remove_line(i + 2)
-                snippet.remove_line(i + 1)
-                changes += 1
-                break
-            if line == "PUSH 2" and line_equal(i + 1, "DIV2"):
-                snippet.codes[i] = "MACRO_DIV2"
-                snippet.remove_line(i + 1)
-                changes += 1
-                break
-            if line == "PUSH 3" and line_equal(i + 1, "DIV2"):
-                snippet.codes[i] = "MACRO_DIV3"
-                snippet.remove_line(i + 1)
-                changes += 1
-                break
-            if line == "PUSH 3" and line_equal(i + 1, "MUL"):
-                snippet.codes[i] = "MACRO_MUL3"
-                snippet.remove_line(i + 1)
-                changes += 1
-                break
+class Var:
+    """ Operand capture in a pattern: binds the operand on first use, later uses must be equal.
+    In replacement, stands for the captured value """
+    def __init__(self, name: str):
+        self.name = name
 
-            if line_starts_with(i + 1, "JF "):
-                conditions = ["EQ", "NE", "LESS", "LESS_OR_EQ", "GREATER", "GREATER_OR_EQ", "ZERO", "NZERO"]
-                if line in conditions:
-                    target = snippet.codes[i + 1][3:]
-                    idx = conditions.index(line)
-                    snippet.codes[i] = f"MACRO_CONDITIONAL_JF {idx} {target}"
-                    snippet.remove_line(i + 1)
-                    changes += 1
-                    break
-
-            if line_starts_with(i, "STORE_LOCAL ") and (line_starts_with(i+1, "LOAD") or line_starts_with(i+1, "MACRO_LOAD")) and line_starts_with(i+2, "LOAD_LOCAL ") and line_equal(i+3, "EXTEND") and line_equal(i+4, "ADD16"):
-                variable1 = snippet.codes[i][12:]
-                variable2 = snippet.codes[i+2][11:]
-                if variable1 == variable2:
-                    # reorder instructions for later optimizations:
-                    snippet.codes[i+1], snippet.codes[i+2] = snippet.codes[i+2], snippet.codes[i+1]
-                    snippet.codes[i + 3] = "MACRO_ADD16_TO_8"
-                    snippet.remove_line(i + 4)
-                    changes = 1
-                    break
-
-            if line_starts_with(i, "STORE_LOCAL ") and line_starts_with(i + 1, "LOAD_LOCAL "):
-                variable1 = snippet.codes[i][12:]
-                variable2 = snippet.codes[i + 1][11:]
-                if variable1 == variable2:
-                    snippet.codes[i] = f"STORE_LOCAL_KEEP {variable1}"
-                    snippet.remove_line(i+1)
-                    changes = 1
-                    break
-            if line_starts_with(i, "STORE_LOCAL16 ") and line_starts_with(i + 1, "LOAD_LOCAL16 "):
-                variable1 = snippet.codes[i][14:]
-                variable2 = snippet.codes[i + 1][13:]
-                if variable1 == variable2:
-                    snippet.codes[i] = f"STORE_LOCAL_KEEP16 {variable1}"
-                    snippet.remove_line(i+1)
-                    changes = 1
-                    break
-
-            if line == "PUSH_STACK_START" and line_starts_with(i + 1, "PUSH16 #") and line_equal(i+2, "ADD16") and line_equal(i+3, "LOAD_GLOBAL16"):
-                variable = snippet.codes[i + 1][8:]
-                snippet.codes[i] = f"MACRO_LOAD_GLOBAL_VAR16 {variable}"
-                snippet.remove_line(i + 3)
-                snippet.remove_line(i + 2)
-                snippet.remove_line(i + 1)
-                changes += 1
-                break
-            if line == "PUSH_STACK_START" and line_starts_with(i + 1, "PUSH16 #") and line_equal(i+2, "ADD16") and line_equal(i+3, "LOAD_GLOBAL"):
-                variable = snippet.codes[i + 1][8:]
-                snippet.codes[i] = f"MACRO_LOAD_GLOBAL_VAR {variable}"
-                snippet.remove_line(i + 3)
-                snippet.remove_line(i + 2)
-                snippet.remove_line(i + 1)
-                changes += 1
-                break
-            if line == "PUSH_STACK_START" and line_equal(i+1, "LOAD_GLOBAL16"):
-                snippet.codes[i] = f"MACRO_LOAD_GLOBAL_VAR16 0"
-                snippet.remove_line(i + 1)
-                changes += 1
-                break
-            if line == "PUSH_STACK_START" and line_equal(i+1, "LOAD_GLOBAL"):
-                snippet.codes[i] = f"MACRO_LOAD_GLOBAL_VAR 0"
-                snippet.remove_line(i + 1)
-                changes += 1
+
+class Op:
+    """ Pattern element: one instruction with opcode from given set, and optionally its operands
+    (literal values or Var captures) """
+    def __init__(self, opcodes: Union[Opcode, Iterable[Opcode]], *operands):
+        self.opcodes = frozenset((opcodes,) if isinstance(opcodes, Opcode) else opcodes)
+        self.operands = operands
+
+
+class Keep:
+    """ Replacement element: matched instruction at given position of the pattern, unchanged """
+    def __init__(self, index: int):
+        self.index = index
+
+
+class Emit:
+    """ Replacement element: new instruction. Operands are literals, Var references or functions of the match.
+    Comment and source line are taken from matched instruction at position source """
+    def __init__(self, opcode: Opcode, *operands, source: int = 0):
+        self.opcode = opcode
+        self.operands = operands
+        self.source = source
+
+
+class Match:
+    def __init__(self, instructions: Sequence[Instruction], captures: Dict[str, Any]):
+        self.instructions = instructions
+        self.captures = captures
+
+    def __getitem__(self, item):
+        if isinstance(item, int):
+            return self.instructions[item]
+        return self.captures[item]
+
+
+class Rule:
+    def __init__(self, pattern: Sequence[Union[Opcode, Op]], replacement: Sequence[Union[Keep, Emit]],
+                 condition: Optional[Callable[[Match], bool]] = None):
+        self.pattern = [p if isinstance(p, Op) else Op(p) for p in pattern]
+        self.replacement = replacement
+        self.condition = condition
+
+    def match(self, codes: List[Instruction], i: int) -> Optional[Match]:
+        """ Opcodes are already matched by the automaton, checks operands and condition """
+        instructions = codes[i:i + len(self.pattern)]
+        captures = {}
+        for element, instruction in zip(self.pattern, instructions):
+            if not element.operands:
+                continue
+            if len(element.operands) != len(instruction.operands):
+                return None
+            for expected, operand in zip(element.operands, instruction.operands):
+                if isinstance(expected, Var):
+                    if expected.name not in captures:
+                        captures[expected.name] = operand
+                    elif captures[expected.name] != operand:
+                        return None
+                elif expected != operand:
+                    return None
+        match = Match(instructions, captures)
+        if self.condition and not self.condition(match):
+            return None
+        return match
+
+    def rewrite(self, match: Match) -> List[Instruction]:
+        ret = []
+        for element in self.replacement:
+            if isinstance(element, Keep):
+                ret.append(match[element.index])
+                continue
+            operands = []
+            for o in element.operands:
+                if isinstance(o, Var):
+                    o = match[o.name]
+                elif callable(o):
+                    o = o(match)
+                operands.append(o)
+            ret.append(match[element.source].with_opcode(element.opcode, *operands))
+        return ret
+
+
+RULES = [
+    Rule([Opcode.AND, Opcode.EXTEND], [Emit(Opcode.MACRO_ANDX)]),
+    Rule([Opcode.OR, Opcode.EXTEND], [Emit(Opcode.MACRO_ORX)]),
+    Rule([Opcode.EXTEND, Opcode.ADD16], [Emit(Opcode.MACRO_ADD8_TO_16)]),
+    Rule([Opcode.EXTEND, Opcode.LSH16], [Emit(Opcode.MACRO_LSH16_BY8)]),
+    Rule([Opcode.EXTEND, Opcode.MACRO_X216, Opcode.ADD16, Opcode.LOAD_GLOBAL16, Op(Opcode.LOAD_LOCAL16, Var("v"))],
+         [Emit(Opcode.MACRO_POP_EXT_X2_ADD16_LG16_LL16, Var("v"), source=4)]),
+    Rule([Opcode.EXTEND, Opcode.MACRO_X216, Opcode.ADD16, Opcode.LOAD_GLOBAL16],
+         [Emit(Opcode.MACRO_POP_EXT_X2_ADD16_LG16)]),
+    Rule([Opcode.EXTEND, Opcode.MACRO_X216, Opcode.ADD16], [Emit(Opcode.MACRO_POP_EXT_X2_ADD16)]),
+    Rule([Op(Opcode.PUSH, 2), Opcode.DIV2], [Emit(Opcode.MACRO_DIV2)]),
+    Rule([Op(Opcode.PUSH, 3), Opcode.DIV2], [Emit(Opcode.MACRO_DIV3)]),
+    Rule([Op(Opcode.PUSH, 3), Opcode.MUL], [Emit(Opcode.MACRO_X3)]),
+    Rule([Op(CONDITIONS), Op(Opcode.JF, Var("target"))],
+         [Emit(Opcode.MACRO_CONDITIONAL_JF, lambda m: CONDITIONS.index(m[0].opcode), Var("target"))]),
+    # reorder instructions for later optimizations:
+    Rule([Op(Opcode.STORE_LOCAL, Var("v")), Op(LOADS), Op(Opcode.LOAD_LOCAL, Var("v")), Opcode.EXTEND, Opcode.ADD16],
+         [Keep(0), Keep(2), Keep(1), Emit(Opcode.MACRO_ADD16_TO_8, source=3)]),
+    Rule([Op(Opcode.STORE_LOCAL, Var("v")), Op(Opcode.LOAD_LOCAL, Var("v"))],
+         [Emit(Opcode.STORE_LOCAL_KEEP, Var("v"))]),
+    Rule([Op(Opcode.STORE_LOCAL16, Var("v")), Op(Opcode.LOAD_LOCAL16, Var("v"))],
+         [Emit(Opcode.STORE_LOCAL_KEEP16, Var("v"))]),
+    Rule([Opcode.PUSH_STACK_START, Op(Opcode.PUSH16, Var("offset")), Opcode.ADD16, Opcode.LOAD_GLOBAL16],
+         [Emit(Opcode.MACRO_LOAD_GLOBAL_VAR16, lambda m: int(m["offset"]))],
+         condition=lambda m: isinstance(m["offset"], Imm16)),
+    Rule([Opcode.PUSH_STACK_START, Op(Opcode.PUSH16, Var("offset")), Opcode.ADD16, Opcode.LOAD_GLOBAL],
+         [Emit(Opcode.MACRO_LOAD_GLOBAL_VAR, lambda m: int(m["offset"]))],
+         condition=lambda m: isinstance(m["offset"], Imm16)),
+    Rule([Opcode.PUSH_STACK_START, Opcode.LOAD_GLOBAL16], [Emit(Opcode.MACRO_LOAD_GLOBAL_VAR16, 0)]),
+    Rule([Opcode.PUSH_STACK_START, Opcode.LOAD_GLOBAL], [Emit(Opcode.MACRO_LOAD_GLOBAL_VAR, 0)]),
+]
+
+
+class _State:
+    """ State of matching automaton: a trie of opcodes of all rule patterns """
+    __slots__ = ("next", "rules")
+
+    def __init__(self):
+        self.next: Dict[Opcode, "_State"] = {}
+        self.rules: List[int] = []  # indexes of rules, whose pattern ends here
+
+
+class PeepholeOptimizer:
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = rules
+        self.window = max(len(r.pattern) for r in rules)
+        self._start = _State()
+        for index, rule in enumerate(rules):
+            states = [self._start]
+            for element in rule.pattern:
+                states = [s.next.setdefault(opcode, _State()) for s in states for opcode in element.opcodes]
+            for s in states:
+                s.rules.append(index)
+
+    def _rewrite_at(self, codes: List[Instruction], i: int) -> bool:
+        """ Applies first rule (in order of declaration) matching instructions starting at i """
+        candidates = []
+        state = self._start
+        for instruction in codes[i:i + self.window]:
+            state = state.next.get(instruction.opcode)
+            if state is None:
                 break
+            candidates += state.rules
+        for index in sorted(candidates):
+            rule = self.rules[index]
+            match = rule.match(codes, i)
+            if match:
+                codes[i:i + len(rule.pattern)] = rule.rewrite(match)
+                return True
+        return False
 
+    def optimize(self, snippet: CodeSnippet):
+        codes = snippet.codes
+        i = 0
+        while i < len(codes):
+            if self._rewrite_at(codes, i):
+                # windows starting before were checked and did not change, except the ones reaching i
+                i = max(0, i - self.window + 1)
+            else:
+                i += 1
+
+
+_default_optimizer = PeepholeOptimizer(RULES)
+
+
+def peephole_optimize(snippet: CodeSnippet):
+    _default_optimizer.optimize(snippet)
@@ -0,0 +1,128 @@
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Any
+
+
+class PhaseStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.total_time = 0.0  # seconds, including nested phases
+        self.self_time = 0.0  # seconds, without nested phases
+        self.allocated_blocks = 0  # net number of memory blocks still allocated at the end of phase
+        self.allocated_bytes = 0  # net traced memory growth
+        self.peak_bytes = 0  # highest traced memory above the start of phase
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "total_ms": self.total_time * 1000, "self_ms": self.self_time * 1000,
+                "allocated_blocks": self.allocated_blocks, "allocated_bytes": self.allocated_bytes,
+                "peak_bytes": self.peak_bytes}
+
+
+class _Frame:
+    """ One running phase """
+    __slots__ = ("stats", "start", "nested_time", "start_blocks", "start_bytes", "peak")
+
+    def __init__(self, stats: PhaseStats):
+        self.stats = stats
+        self.nested_time = 0.0
+        self.start_blocks = sys.getallocatedblocks()
+        self.start_bytes, self.peak = tracemalloc.get_traced_memory()
+        self.start = time.perf_counter()
+
+
+class PassTimer:
+    """ Collects wall time, call counts and allocations of compiler phases (--time-passes).
+
+    Phases may be nested, for example peephole inside gen_code: total time includes nested phases, self time does not.
+    Memory is measured by tracemalloc, started by the timer if not running yet, block counts by sys.getallocatedblocks.
+    Passes can attach extra figures with add_details, AstOptimizer reports its rounds and fired rewrites there.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, PhaseStats] = {}
+        self.details: Dict[str, Dict[str, Any]] = {}
+        self._stack: List[_Frame] = []
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+    def stop(self):
+        """ Stops tracemalloc, if it was started by this timer """
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def phase(self, name: str):
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats(name)
+        if self._stack:
+            # reset_peak below would lose the peak of the running phase
+            parent = self._stack[-1]
+            parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        frame = _Frame(stats)
+        self._stack.append(frame)
+        try:
+            yield stats
+        finally:
+            elapsed = time.perf_counter() - frame.start
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(frame.peak, peak)
+            self._stack.pop()
+            stats.calls += 1
+            stats.total_time += elapsed
+            stats.self_time += elapsed - frame.nested_time
+            stats.allocated_blocks += sys.getallocatedblocks() - frame.start_blocks
+            stats.allocated_bytes += current - frame.start_bytes
+            stats.peak_bytes = max(stats.peak_bytes, peak - frame.start_bytes)
+            if self._stack:
+                parent = self._stack[-1]
+                parent.nested_time += elapsed
+                parent.peak = max(parent.peak, peak)
+
+    def add_details(self, name: str, details: Dict[str, Any]):
+        """ Details of repeated passes are summed up """
+        self.details[name] = self._sum(self.details.get(name, {}), details)
+
+    @staticmethod
+    def _sum(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+        ret = dict(old)
+        for key, value in new.items():
+            if isinstance(value, dict):
+                ret[key] = PassTimer._sum(old.get(key, {}), value)
+            else:
+                ret[key] = old.get(key, 0) + value
+        return ret
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"phases": {name: stats.to_dict() for name, stats in self.phases.items()},
+                "details": self.details}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def table(self) -> str:
+        lines = [f"{'phase':<20}{'calls':>7}{'total ms':>11}{'self ms':>11}{'blocks':>10}{'KiB':>10}{'peak KiB':>10}"]
+        for s in self.phases.values():
+            lines.append(f"{s.name:<20}{s.calls:>7}{s.total_time * 1000:>11.2f}{s.self_time * 1000:>11.2f}"
+                         f"{s.allocated_blocks:>10}{s.allocated_bytes / 1024:>10.1f}{s.peak_bytes / 1024:>10.1f}")
+        for name, details in self.details.items():
+            lines.append(f"{name}:")
+            for key, value in details.items():
+                if isinstance(value, dict):
+                    lines.append(f"  {key}:")
+                    lines += [f"    {k}: {v}" for k, v in value.items()]
+                else:
+                    lines.append(f"  {key}: {value}")
+        return "\n".join(lines)
+
+
+def timed(timer: Optional[PassTimer], name: str):
+    """ timer.phase(name), or nothing if there is no timer """
+    return timer.phase(name) if timer else nullcontext()
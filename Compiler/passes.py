@@ -0,0 +1,16 @@
+from typing import Optional
+
+from ast_optimizer import AstOptimizer
+from constant_propagation import ConstantPropagation
+from dead_store_elimination import DeadStoreElimination
+from myast import AstProgram
+from pass_timer import PassTimer
+
+
+def optimize_tree(tree: AstProgram, timer: Optional[PassTimer] = None):
+    """ All AST optimizations. Local rewrites go first, then the dataflow passes,
+    each of them followed by local rewrites again (e.g. folding of propagated constants) until nothing changes """
+    AstOptimizer(tree, timer).run()
+    while ConstantPropagation(tree, timer).run():
+        AstOptimizer(tree, timer).run()
+    DeadStoreElimination(tree, timer).run()
@@ -1,6 +1,7 @@
 from symbols import *
 
-from lexer import Lexer, Symbol
+from ast_optimizer import AstOptimizer
+from lexer import Symbol, TokenStreamLexer
 from myast import AstProgram, VariableUsageLHS, VariableUsageRHS, BinaryOperation, Number, \
     Assign, Function, AbstractBlock, AbstractStatement, BinOpType, GroupOfStatements, \
     AbstractExpression, ConstantUsage, Condition, LogicalOperation, SumOperation, UnaryOperation, UnOpType, \
@@ -10,13 +11,47 @@ from myast import AstProgram, VariableUsageLHS, VariableUsageRHS, BinaryOperatio
     ReturningCall, ArrayInitializationStatement, ArrayInitialization_InitializerList, ArrayInitialization_Pointer, \
     ArrayInitialization_StackAlloc, VariableUsage, SubtractOperation, Instruction_AddressOfString, \
     Instruction_AddressOfVariable, Syscall_ReadKey, Syscall_GetRandomNumber, NonReturningSyscall, \
-    VariableUsageJustStructAddress, DivisionOperation
+    VariableUsageJustStructAddress, DivisionOperation, ModuloOperation
 from symbol_table import SymbolTable
 
+# Binary operator precedence levels, from the loosest binding
+PREC_CHAIN = 1  # && ||
+PREC_RELATIONAL = 2  # == != < <= > >=
+PREC_ADDITIVE = 3  # + - | ^
+PREC_MULTIPLICATIVE = 4  # * / % & << >>
+
+# Symbol -> (precedence, operation, node class)
+# Specialized node classes are important for constant folding
+BINARY_OPERATORS = {
+    Symbol.Or: (PREC_CHAIN, BinOpType.LogicalOr, LogicalChainOperation),
+    Symbol.And: (PREC_CHAIN, BinOpType.LogicalAnd, LogicalChainOperation),
+    Symbol.Equals: (PREC_RELATIONAL, BinOpType.Equals, LogicalOperation),
+    Symbol.NotEqual: (PREC_RELATIONAL, BinOpType.NotEqual, LogicalOperation),
+    Symbol.Gt: (PREC_RELATIONAL, BinOpType.Gt, LogicalOperation),
+    Symbol.Ge: (PREC_RELATIONAL, BinOpType.Ge, LogicalOperation),
+    Symbol.Lt: (PREC_RELATIONAL, BinOpType.Lt, LogicalOperation),
+    Symbol.Le: (PREC_RELATIONAL, BinOpType.Le, LogicalOperation),
+    Symbol.Plus: (PREC_ADDITIVE, BinOpType.Add, SumOperation),
+    Symbol.Minus: (PREC_ADDITIVE, BinOpType.Sub, SubtractOperation),
+    Symbol.Pipe: (PREC_ADDITIVE, BinOpType.BitOr, BinaryOperation),
+    Symbol.Hat: (PREC_ADDITIVE, BinOpType.BitXor, BinaryOperation),
+    Symbol.Mult: (PREC_MULTIPLICATIVE, BinOpType.Mul, MultiplyOperation),
+    Symbol.Divide: (PREC_MULTIPLICATIVE, BinOpType.Div, DivisionOperation),
+    Symbol.Modulo: (PREC_MULTIPLICATIVE, BinOpType.Mod, ModuloOperation),
+    Symbol.Ampersand: (PREC_MULTIPLICATIVE, BinOpType.BitAnd, BinaryOperation),
+    Symbol.Lsh: (PREC_MULTIPLICATIVE, BinOpType.Lsh, BinaryOperation),
+    Symbol.Rsh: (PREC_MULTIPLICATIVE, BinOpType.Rsh, BinaryOperation),
+}
+
+UNARY_OPERATORS = {
+    Symbol.Minus: UnOpType.UnaryMinus,
+    Symbol.Tilde: UnOpType.BitNegate,
+}
+
 
 class Parser:
     def __init__(self, input_string: str):
-        self._lex = Lexer(input_string)
+        self._lex = TokenStreamLexer(input_string)
 
         self._if_counter = 1
         self._while_counter = 1
@@ -153,49 +188,59 @@ class Parser:
         return ret
 
     def _parse_factor(self) -> AbstractExpression:
-        if self._accept(Symbol.Hash):
-            self._expect(Symbol.Number)
-            return Number(self._lex.line_number, self._lex.current_number, Type.Addr)
-        elif self._accept(Symbol.Identifier):
-            var_name = self._lex.current_identifier
-
-            if self._accept(Symbol.LParen):
+        lex = self._lex
+        current = lex.current
+        if current == Symbol.Identifier:
+            lex.next_symbol()
+            var_name = lex.current_identifier
+
+            after_name = lex.current
+            if after_name == Symbol.LParen:
                 # Intrinsics that return value
+                lex.next_symbol()
                 return self._parse_intrinsic(var_name, expected_return=True)
 
             constant = self.symbol_table.get_constant(self._current_context, var_name)
             if constant is not None:
-                return ConstantUsage(self._lex.line_number, constant)
+                return ConstantUsage(lex.line_number, constant)
 
             var_def = self.symbol_table.get_variable(self._current_context, var_name)
-            node = VariableUsageRHS(self._lex.line_number, var_def)
+            node = VariableUsageRHS(lex.line_number, var_def)
 
             if var_def.struct_def:
                 last_var_in_chain, node = self._generate_struct_address(var_def, var_name, False)
                 return node
 
-            if self._accept(Symbol.LBracket):
+            if after_name == Symbol.LBracket:
+                lex.next_symbol()
                 if not var_def.is_array:
                     self._error(f"Variable {var_name} is not an array!")
 
                 if self._accept(Symbol.RBracket):
                     # arr[] is the same as arr[0]
-                    node.array_jump = Number(self._lex.line_number, 0, Type.Addr)
+                    node.array_jump = Number(lex.line_number, 0, Type.Addr)
                 else:
                     expr = self._parse_expression()
                     self._expect(Symbol.RBracket)
                     node.array_jump = expr
 
             return node
-        elif self._accept(Symbol.Number):
-            number_type = Type.Byte if self._lex.current_number <= 255 else Type.Addr
-            return Number(self._lex.line_number, self._lex.current_number, number_type)
-        elif self._accept(Symbol.LParen):
+        elif current == Symbol.Number:
+            lex.next_symbol()
+            number_type = Type.Byte if lex.current_number <= 255 else Type.Addr
+            return Number(lex.line_number, lex.current_number, number_type)
+        elif current == Symbol.Hash:
+            lex.next_symbol()
+            self._expect(Symbol.Number)
+            return Number(lex.line_number, lex.current_number, Type.Addr)
+        elif current == Symbol.LParen:
+            lex.next_symbol()
             node = self._parse_sum()
             self._expect(Symbol.RParen)
             return node
-        elif self._accept(Symbol.Char):
-            val = self._lex.current_string
+        elif current == Symbol.Char:
+            lex.next_symbol()
+            val = lex.current_string
             if val == "\\n":
                 val = "\n"
             elif val == "\\r":
@@ -208,9 +253,10 @@ class Parser:
             if len(val) != 1:
                 self._error("Expected exactly one character in single quotes!")
 
-            return Number(self._lex.line_number, ord(val), Type.Byte)
+            return Number(lex.line_number, ord(val), Type.Byte)
 
-        elif self._accept(Symbol.Call):
+        elif current == Symbol.Call:
+            lex.next_symbol()
             fcall = self._parse_function_call(inside_expression=True)
             if not isinstance(fcall, ReturningCall):
                 self._error("Expected function returning value")
@@ -219,143 +265,54 @@ class Parser:
         else:
             self._error("factor: syntax error")
 
-    def _parse_logical(self) -> AbstractExpression:
-        node = self._parse_sum()
-        while self._lex.current in (Symbol.Equals, Symbol.NotEqual, Symbol.Ge, Symbol.Gt, Symbol.Le, Symbol.Lt):
-            v = self._lex.current
-            self._lex.next_symbol()
-            expr = self._parse_sum()
-            if v == Symbol.Equals:
-                op = BinOpType.Equals
-            elif v == Symbol.NotEqual:
-                op = BinOpType.NotEqual
-            elif v == Symbol.Gt:
-                op = BinOpType.Gt
-            elif v == Symbol.Ge:
-                op = BinOpType.Ge
-            elif v == Symbol.Lt:
-                op = BinOpType.Lt
-            elif v == Symbol.Le:
-                op = BinOpType.Le
-            else:
-                raise NotImplementedError(self._lex.current)
-
-            old_node = node
-            node = LogicalOperation(self._lex.line_number, op)
-            node.operand1 = old_node
-            node.operand2 = expr
-        return node
-
     def _parse_expression(self) -> AbstractExpression:
-        return self._parse_logical_chain()
+        return self._parse_binary(PREC_CHAIN)
 
-    def _parse_logical_chain(self) -> AbstractExpression:
-        node = self._parse_logical()
-        has_chain = False
-        while self._lex.current in (Symbol.And, Symbol.Or):
-            if self._accept(Symbol.Or):
-                has_chain = True
+    def _parse_sum(self) -> AbstractExpression:
+        """ Expression without logical and relational operators """
+        return self._parse_binary(PREC_ADDITIVE)
+
+    def _parse_binary(self, min_precedence: int) -> AbstractExpression:
+        """ Precedence climbing over BINARY_OPERATORS, all operators are left associative.
+        Unary minus and bit negation are allowed only at the beginning of a sum and apply to its first term.
+        Nodes are created after their right operand is parsed, so they get line number of its end """
+        lex = self._lex
+        unary_op = UNARY_OPERATORS.get(lex.current) if min_precedence <= PREC_ADDITIVE else None
+        if unary_op is not None:
+            lex.next_symbol()
+            node = self._parse_binary(PREC_MULTIPLICATIVE)
+            node = UnaryOperation(lex.line_number, unary_op, node)
+        else:
+            node = self._parse_factor()
 
-                expr = self._parse_logical()
-                old_node = node
-                node = LogicalChainOperation(self._lex.line_number, BinOpType.LogicalOr, self._condition_counter)
-                node.operand1 = old_node
-                node.operand2 = expr
+        has_chain = False
+        while True:
+            operator = BINARY_OPERATORS.get(lex.current)
+            if operator is None or operator[0] < min_precedence:
+                break
+            precedence, op, node_class = operator
+            lex.next_symbol()
+            if precedence == PREC_MULTIPLICATIVE:
+                operand2 = self._parse_factor()
+            else:
+                operand2 = self._parse_binary(precedence + 1)
 
-            elif self._accept(Symbol.And):
+            if node_class is LogicalChainOperation:
                 has_chain = True
-
-                expr = self._parse_logical()
-                old_node = node
-                node = LogicalChainOperation(self._lex.line_number, BinOpType.LogicalAnd, self._condition_counter)
-                node.operand1 = old_node
-                node.operand2 = expr
+                new_node = LogicalChainOperation(lex.line_number, op, self._condition_counter)
+            elif node_class is BinaryOperation or node_class is LogicalOperation:
+                new_node = node_class(lex.line_number, op)
+            else:
+                new_node = node_class(lex.line_number)
+            new_node.operand1 = node
+            new_node.operand2 = operand2
+            node = new_node
 
         if has_chain:
+            # all conditions of one chain share the end label
             self._condition_counter += 1
         return node
 
-    def _parse_term(self) -> AbstractExpression:
-        node = self._parse_factor()
-        while self._lex.current in (
-                Symbol.Mult, Symbol.Divide, Symbol.Modulo, Symbol.Ampersand, Symbol.Lsh, Symbol.Rsh):
-            v = self._lex.current
-            self._lex.next_symbol()
-            node2 = self._parse_factor()
-
-            old_node = node
-            node = None
-
-            if v == Symbol.Mult:
-                op_ = BinOpType.Mul
-                node = MultiplyOperation(self._lex.line_number)  # specialization important for constant folding
-            elif v == Symbol.Divide:
-                op_ = BinOpType.Div
-                node = DivisionOperation(self._lex.line_number)  # specialization important for constant folding
-            elif v == Symbol.Modulo:
-                op_ = BinOpType.Mod
-            elif v == Symbol.Ampersand:
-                op_ = BinOpType.BitAnd
-            elif v == Symbol.Lsh:
-                op_ = BinOpType.Lsh
-            elif v == Symbol.Rsh:
-                op_ = BinOpType.Rsh
-            else:
-                raise NotImplementedError(self._lex.current)
-
-            if node is None:
-                node = BinaryOperation(self._lex.line_number, op_)
-            node.operand1 = old_node
-            node.operand2 = node2
-
-        return node
-
-    def _parse_sum(self) -> AbstractExpression:
-        unary_minus = False
-        negate = False
-
-        if self._lex.current == Symbol.Minus:
-            unary_minus = True
-            self._lex.next_symbol()
-        elif self._lex.current == Symbol.Tilde:
-            negate = True
-            self._lex.next_symbol()
-
-        node = self._parse_term()
-
-        if unary_minus:
-            node = UnaryOperation(self._lex.line_number, UnOpType.UnaryMinus, node)
-        if negate:
-            node = UnaryOperation(self._lex.line_number, UnOpType.BitNegate, node)
-
-        while self._lex.current in (Symbol.Plus, Symbol.Minus, Symbol.Pipe, Symbol.Hat):
-            v = self._lex.current
-            self._lex.next_symbol()
-            node2 = self._parse_term()
-
-            old_node = node
-            node = None
-
-            if v == Symbol.Plus:
-                op_ = BinOpType.Add
-                node = SumOperation(self._lex.line_number, )
-            elif v == Symbol.Minus:
-                op_ = BinOpType.Sub
-                node = SubtractOperation(self._lex.line_number, )
-            elif v == Symbol.Pipe:
-                op_ = BinOpType.BitOr
-            elif v == Symbol.Hat:
-                op_ = BinOpType.BitXor
-            else:
-                raise NotImplementedError(v)
-
-            if node is None:
-                node = BinaryOperation(self._lex.line_number, op_)
-
-            node.operand1 = old_node
-            node.operand2 = node2
-        return node
-
     def _generate_struct_address(self, var: Variable, var_name: str, is_lhs) -> (Variable, VariableUsage):
         """ Generates instructions to compute address of last member in struct chain
          Returns this last member variable """
@@ -416,14 +373,14 @@ class Parser:
                 stmt = None
                 if self._accept(Symbol.Becomes):  # initial value, like byte A = 1;
                     decl = VariableUsageLHS(self._lex.line_number, var_def)
-                    val = self._parse_logical_chain()
+                    val = self._parse_expression()
                     stmt = Assign(self._lex.line_number, decl, val)
                 self._expect(Symbol.Semicolon)
                 return stmt
 
-        elif self._lex.current == Symbol.Identifier and (
+        elif self._lex.current == Symbol.Identifier and self._lex.peek() == Symbol.Identifier and (
         struct_def := self.symbol_table.get_struct_definition(self._lex.current_identifier)):
-            # struct init
+            # struct init: StructName var_name, decided by one token look-ahead
             self._lex.next_symbol()
             self._expect(Symbol.Identifier)
             var_name = self._lex.current_identifier
@@ -781,7 +738,7 @@ class Parser:
                         arg.array_fixed_size = size
                     else:
                         arg = Variable(var_name, var_type)
-                    definition.members[var_name] = arg
+                    definition.add_member(var_name, arg)
                 elif self._lex.current == Symbol.Identifier and (
                 nested_struct := self.symbol_table.get_struct_definition(self._lex.current_identifier)):
                     # nested struct
@@ -798,7 +755,7 @@ class Parser:
                         arg.array_fixed_size = size
                     else:
                         arg = Variable(var_name, Type.Struct, struct_def=nested_struct)
-                    definition.members[var_name] = arg
+                    definition.add_member(var_name, arg)
 
                 else:
                     self._error("Expected type")
@@ -827,9 +784,7 @@ a[2] = a[0];
     """)
     tree = parser.do_parse()
     # tree.print(0)
-    opt = True
-    while opt:
-        opt = tree.optimize()
+    AstOptimizer(tree).run()
     code = tree.gen_code(None)
     code.print()
     pass
@@ -1,19 +1,40 @@
+import argparse
 import os
 
 from codegen_helpers import write_code_to_file
+from frame_layout import dump_frame_layouts
+from pass_timer import PassTimer, timed
+from passes import optimize_tree
 from recursive_descent_parser import Parser
 
-with open("input.prg", "rt") as program:
+arg_parser = argparse.ArgumentParser(description="Compile a program and run it in AVM")
+arg_parser.add_argument("input", nargs="?", default="input.prg")
+arg_parser.add_argument("--dump-frames", action="store_true",
+                        help="print offsets and sizes of arguments and variables of every function")
+arg_parser.add_argument("--time-passes", nargs="?", const="table", choices=["table", "json"],
+                        help="print time, calls and allocations of compiler phases, as a table or JSON")
+args = arg_parser.parse_args()
+
+with open(args.input, "rt") as program:
     text = program.read()
 
-parser = Parser(text)
-tree = parser.do_parse()
-opt = True
-while opt:
-    opt = tree.optimize()
-code = tree.gen_code(True)
+timer = PassTimer() if args.time_passes else None
+with timed(timer, "lex"):
+    parser = Parser(text)
+with timed(timer, "parse"):
+    tree = parser.do_parse()
+optimize_tree(tree, timer)
+with timed(timer, "gen_code"):
+    code = tree.gen_code(True, timer)
+
+if timer:
+    timer.stop()
+    print(timer.to_json() if args.time_passes == "json" else timer.table())
+
+if args.dump_frames:
+    print(dump_frame_layouts(tree.symbol_table))
 
 write_code_to_file(code, text, "output.asm", write_debug_info=False)
 
 runtime = r"..\x64\Release\Runtime.exe"
-os.system(f"{runtime} output.asm -r -c")
\ No newline at end of file
+os.system(f"{runtime} output.asm -r -c")
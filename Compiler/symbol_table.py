@@ -1,5 +1,6 @@
 from typing import Dict, Optional, List
 
+from frame_layout import FrameLayout
 from symbols import StructDefinition, FunctionSignature, Constant, Variable, Type
 
 
@@ -15,12 +16,14 @@ class SymbolTable:
 
         self._function_signatures: Dict[str, FunctionSignature] = {}
         self._struct_definitions: Dict[str, "StructDefinition"] = {}
+        self._frame_layouts: Dict[str, FrameLayout] = {}  # per scope, built on first use
 
     def register_variable(self, scope: str, name: str, type_: Type, is_array: bool = False, from_global: bool = False,
                            struct_def: Optional[StructDefinition] = None) -> Variable:
         if scope in self._function_signatures:
             if name in self._function_signatures[scope].args:
                 return self._function_signatures[scope].args[name]
+        self.invalidate_frame_layouts()
         vdef = Variable(name, type_, is_array=is_array, from_global=from_global, struct_def=struct_def)
         if scope not in self._local_variables:
             self._local_variables[scope] = {name: vdef}
@@ -29,6 +32,11 @@ class SymbolTable:
                 self._local_variables[scope][name] = vdef
         return vdef
 
+    def remove_variable(self, scope: str, name: str):
+        """ Removes unused variable, the remaining ones get new offsets """
+        self.invalidate_frame_layouts()
+        del self._local_variables[scope][name]
+
     def register_constant(self, scope: str, name: str, type_: Type, value: int) -> Constant:
         cdef = Constant(name, type_, value)
         if scope not in self._constants:
@@ -39,6 +47,7 @@ class SymbolTable:
         return cdef
 
     def register_function(self, name, signature: FunctionSignature):
+        self.invalidate_frame_layouts()
         self._function_signatures[name] = signature
 
     def register_struct(self, name, signature: StructDefinition):
@@ -102,4 +111,19 @@ class SymbolTable:
         return self._local_variables[scope]
 
     def get_all_strings(self) -> List[str]:
-        return self._string_constants
\ No newline at end of file
+        return self._string_constants
+
+    def get_function_names(self) -> List[str]:
+        return list(self._function_signatures.keys())
+
+    def get_frame_layout(self, scope) -> FrameLayout:
+        """ Offsets of arguments and variables visible in scope; use empty string for main program """
+        layout = self._frame_layouts.get(scope)
+        if layout is None:
+            layout = FrameLayout(self, scope)
+            self._frame_layouts[scope] = layout
+        return layout
+
+    def invalidate_frame_layouts(self):
+        """ Call after adding, removing or resizing variables once the layouts were computed """
+        self._frame_layouts.clear()
@@ -18,22 +18,35 @@ class StructDefinition:
     def __init__(self, name):
         self._name = name
         self.members: Dict[str, Variable] = {}
+        self._offsets: Optional[Dict[str, int]] = None  # member offsets and total size, computed on first use
+        self._size = 0
 
     @property
     def name(self):
         return self._name
 
-    @property
-    def stack_size(self) -> int:
-        return self.member_offset("")
+    def add_member(self, name: str, member: "Variable"):
+        self.members[name] = member
+        self._offsets = None
 
-    def member_offset(self, member_name: str) -> int:
+    def _compute_layout(self):
+        self._offsets = {}
         offset = 0
         for name, m in self.members.items():
-            if name == member_name:
-                return offset
+            self._offsets[name] = offset
             offset += m.stack_size
-        return offset
+        self._size = offset
+
+    @property
+    def stack_size(self) -> int:
+        if self._offsets is None:
+            self._compute_layout()
+        return self._size
+
+    def member_offset(self, member_name: str) -> int:
+        if self._offsets is None:
+            self._compute_layout()
+        return self._offsets.get(member_name, self._size)
 
 
 class Variable:
@@ -5,7 +5,7 @@ PUSH_REG 1
 STORE_LOCAL16 0 ; a
 PUSH 3
 PUSHN2
-MACRO_SET_LOCAL 2 2
+MACRO_SET_LOCAL 2 2 ; index
 LOAD_LOCAL16 0 ; a
 LOAD_GLOBAL
 INC
@@ -16,8 +16,7 @@ LOAD_GLOBAL
 INC
 STORE_GLOBAL_PTR
 LOAD_LOCAL16 0 ; a
-LOAD_LOCAL 2 ; index
-MACRO_ADD8_TO_16
+ADD16C #2
 LOAD_GLOBAL
 INC
 STORE_GLOBAL_PTR
@@ -27,5 +26,5 @@ LOAD_GLOBAL
 INC
 LOAD_LOCAL16 0 ; a
 STORE_GLOBAL
-MACRO_INC_LOCAL16 0 ;a
+MACRO_INC_LOCAL16 0 ; a
 HALT
\ No newline at end of file
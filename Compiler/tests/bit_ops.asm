@@ -2,57 +2,19 @@
 ; Byte mat[]
 ; Addr val
 PUSHN 5
-PUSH 3
-PUSH 2
-LSH
-PUSH 12
-MACRO_CONDITIONAL_JF 0 @if1_endif
 PUSH16 @string_1
 SYSCALL Std.PrintString
-:if1_endif
-PUSH 12
-PUSH 1
-RSH
-PUSH 6
-MACRO_CONDITIONAL_JF 0 @if2_endif
 PUSH16 @string_1
 SYSCALL Std.PrintString
-:if2_endif
-PUSH 12
-PUSH 1
-RSH
-PUSH 5
-OR
-PUSH 7
-MACRO_CONDITIONAL_JF 0 @if3_endif
 PUSH16 @string_1
 SYSCALL Std.PrintString
-:if3_endif
-PUSH 12
-PUSH 1
-RSH
-PUSH 5
-AND
-PUSH 4
-MACRO_CONDITIONAL_JF 0 @if4_endif
 PUSH16 @string_1
 SYSCALL Std.PrintString
-:if4_endif
-PUSH 12
-PUSH 1
-RSH
-PUSH 5
-XOR
-PUSH 3
-MACRO_CONDITIONAL_JF 0 @if5_endif
 PUSH16 @string_1
 SYSCALL Std.PrintString
-:if5_endif
 SYSCALL Std.PrintNewLine
-MACRO_SET_LOCAL 0 3 ;offs
-PUSH16 #1
-LOAD_LOCAL 0 ; offs
-MACRO_LSH16_BY8
+MACRO_SET_LOCAL 0 3 ; offs
+PUSH16 #8
 SYSCALL Std.PrintInt16
 POPN 2
 SYSCALL Std.PrintNewLine
@@ -0,0 +1,5 @@
+; Byte A
+PUSHN 1
+MACRO_SET_LOCAL 0 1 ; A
+MACRO_SET_LOCAL 0 1 ; A
+HALT
\ No newline at end of file
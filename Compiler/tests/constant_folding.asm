@@ -1,22 +1,20 @@
 ; Byte a
 ; Byte x
 PUSHN 2
-MACRO_SET_LOCAL 0 4
-MACRO_SET_LOCAL 0 8
-MACRO_SET_LOCAL 0 0
-MACRO_SET_LOCAL 0 4
-MACRO_SET_LOCAL 0 2
-MACRO_SET_LOCAL 0 2
-MACRO_SET_LOCAL 0 2
-MACRO_SET_LOCAL 0 4
-MACRO_SET_LOCAL 1 2
+MACRO_SET_LOCAL 0 4 ; a
+MACRO_SET_LOCAL 0 8 ; a
+MACRO_SET_LOCAL 0 0 ; a
+MACRO_SET_LOCAL 0 4 ; a
+MACRO_SET_LOCAL 0 2 ; a
+MACRO_SET_LOCAL 0 2 ; a
+MACRO_SET_LOCAL 0 2 ; a
+MACRO_SET_LOCAL 0 4 ; a
+MACRO_SET_LOCAL 1 2 ; x
 LOAD_LOCAL 1 ; x
 STORE_LOCAL 0 ; a
-LOAD_LOCAL 1 ; x
-MACRO_X2
-STORE_LOCAL 0 ; a
-MACRO_SET_LOCAL 0 0
-MACRO_SET_LOCAL 0 0
-MACRO_SET_LOCAL 0 0
-MACRO_SET_LOCAL 0 12
+MACRO_SET_LOCAL 0 4 ; a
+MACRO_SET_LOCAL 0 0 ; a
+MACRO_SET_LOCAL 0 0 ; a
+MACRO_SET_LOCAL 0 0 ; a
+MACRO_SET_LOCAL 0 12 ; a
 HALT
\ No newline at end of file
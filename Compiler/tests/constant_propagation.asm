@@ -0,0 +1,131 @@
+; Byte a
+; Byte b
+; Addr c
+; Byte cond
+; Byte d
+; Byte i
+; Byte sum
+; Byte k
+; Byte r
+; Byte g
+; Byte p
+; Byte ptr[]
+; Byte z
+PUSHN 15
+MACRO_SET_LOCAL 0 5 ; a
+MACRO_SET_LOCAL 1 15 ; b
+MACRO_SET_LOCAL16 2 #1015 ; c
+PUSH16 #1015
+SYSCALL Std.PrintInt16
+POPN 2
+SYSCALL Std.PrintNewLine
+PUSH 0
+PUSH 1
+SYSCALL Std.GetRandomNumber
+STORE_LOCAL_KEEP 4 ; cond
+JF @if1_else
+MACRO_SET_LOCAL 5 7 ; d
+JMP @if1_endif
+:if1_else
+MACRO_SET_LOCAL 5 7 ; d
+:if1_endif
+PUSH 8
+SYSCALL Std.PrintInt
+POP
+SYSCALL Std.PrintNewLine
+LOAD_LOCAL 4 ; cond
+JF @if2_else
+MACRO_SET_LOCAL 5 1 ; d
+JMP @if2_endif
+:if2_else
+MACRO_SET_LOCAL 5 2 ; d
+:if2_endif
+LOAD_LOCAL 5 ; d
+PUSH 3
+GREATER
+SYSCALL Std.PrintInt
+POP
+SYSCALL Std.PrintNewLine
+PUSH16 @string_1
+SYSCALL Std.PrintString
+SYSCALL Std.PrintNewLine
+MACRO_SET_LOCAL 6 0 ; i
+MACRO_SET_LOCAL 7 0 ; sum
+:while1_begin
+LOAD_LOCAL 6 ; i
+PUSH 5
+MACRO_CONDITIONAL_JF 4 @while1_endwhile
+LOAD_LOCAL 7 ; sum
+ADDC 5
+STORE_LOCAL 7 ; sum
+MACRO_INC_LOCAL 6 ; i
+JMP @while1_begin
+:while1_endwhile
+LOAD_LOCAL 7 ; sum
+SYSCALL Std.PrintInt
+POP
+SYSCALL Std.PrintNewLine
+MACRO_SET_LOCAL 8 3 ; k
+:while2_begin
+MACRO_DEC_LOCAL 8 ; k
+LOAD_LOCAL 8 ; k
+PUSH 0
+LESS
+JT @while2_begin
+:while2_endwhile
+LOAD_LOCAL 8 ; k
+SYSCALL Std.PrintInt
+POP
+SYSCALL Std.PrintNewLine
+MACRO_SET_LOCAL 9 1 ; r
+PUSH 9
+LOAD_LOCAL 9 ; r
+CALL @function_set_ref
+STORE_LOCAL 9 ; r
+POPN 1
+LOAD_LOCAL 9 ; r
+SYSCALL Std.PrintInt
+POP
+SYSCALL Std.PrintNewLine
+MACRO_SET_LOCAL 10 1 ; g
+CALL @function_set_global
+LOAD_LOCAL 10 ; g
+SYSCALL Std.PrintInt
+POP
+SYSCALL Std.PrintNewLine
+MACRO_SET_LOCAL 11 1 ; p
+PUSH_REG 2
+PUSH16 #11
+ADD16
+STORE_LOCAL16 12 ; ptr
+PUSH 3
+LOAD_LOCAL16 12 ; ptr
+STORE_GLOBAL
+LOAD_LOCAL 11 ; p
+SYSCALL Std.PrintInt
+POP
+SYSCALL Std.PrintNewLine
+MACRO_SET_LOCAL 14 0 ; z
+PUSH16 @string_3
+SYSCALL Std.PrintString
+SYSCALL Std.PrintNewLine
+HALT
+:function_set_ref
+; (Byte value, Byte ret&)
+LOAD_ARG 2 ; value
+STORE_ARG 1 ; ret
+RET
+:function_set_global
+; ()
+PUSH 2
+PUSH_STACK_START
+PUSH16 #10
+ADD16
+STORE_GLOBAL
+RET
+:string_1
+"a > 4"
+:string_2
+"a <= 4"
+:string_3
+"z == 0"
\ No newline at end of file
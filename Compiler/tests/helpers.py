@@ -56,6 +56,7 @@ class Helpers:
 
     def compare_programs(self, input_file: str, output_file: str, optimize=False):
         from recursive_descent_parser import Parser
+        from passes import optimize_tree
         input_file = Helpers._fix_path(input_file)
         output_file = Helpers._fix_path(output_file)
 
@@ -63,9 +64,7 @@ class Helpers:
         parser = Parser(program)
         tree = parser.do_parse()
         if optimize:
-            opt = True
-            while opt:
-                opt = tree.optimize()
-        output = tree.gen_code(optimize).codes
+            optimize_tree(tree)
+        output = [str(c) for c in tree.gen_code(optimize).codes]
         expected_output = self.read_file_to_lines(output_file)
         self.assert_string_list_equal(expected_output, output)
@@ -10,16 +10,16 @@ PUSHN 10
 PUSH 0
 SYSCALL Std.ShowConsoleCursor
 SYSCALL Std.ConsoleClear
-MACRO_SET_LOCAL 0 1 ;direction
-MACRO_SET_LOCAL16 1 #5 ;length
-MACRO_SET_LOCAL 3 24 ;head_x
-MACRO_SET_LOCAL 4 10 ;head_y
-MACRO_SET_LOCAL 5 0 ;fruit_x
-MACRO_SET_LOCAL 6 0 ;fruit_y
+MACRO_SET_LOCAL 0 1 ; direction
+MACRO_SET_LOCAL16 1 #5 ; length
+MACRO_SET_LOCAL 3 24 ; head_x
+MACRO_SET_LOCAL 4 10 ; head_y
+MACRO_SET_LOCAL 5 0 ; fruit_x
+MACRO_SET_LOCAL 6 0 ; fruit_y
 CALL @function_clear_memory
 CALL @function_draw_borders
 CALL @function_write_initial_body
-LOAD_LOCAL16 1 ; length
+PUSH16 #5
 CALL @function_redraw
 POPN 2
 :while10_begin
@@ -84,8 +84,8 @@ EQ
 AND
 :cond2_expr_end
 JF @if22_endif
-MACRO_INC_LOCAL16 1 ;length
-MACRO_SET_LOCAL 5 0 ;fruit_x
+MACRO_INC_LOCAL16 1 ; length
+MACRO_SET_LOCAL 5 0 ; fruit_x
 PUSH 55
 PUSH 11
 SYSCALL Std.SetConsoleCursorPosition
@@ -125,7 +125,7 @@ SYSCALL Std.PrintNewLine
 SYSCALL Std.PrintNewLine
 HALT
 :function_xy_to_mem_loc
-;(Byte x, Byte y, Addr loc&)
+; (Byte x, Byte y, Addr loc&)
 LOAD_ARG 3 ; y
 EXTEND
 DEC16
@@ -139,7 +139,7 @@ ADD16
 STORE_ARG16 2 ; loc
 RET
 :function_clear_memory
-;()
+; ()
 ; Addr endloc[]
 PUSHN 2
 PUSH 50
@@ -152,7 +152,7 @@ POPN 2
 PUSH16 #0
 LOAD_LOCAL16 0 ; endloc
 STORE_GLOBAL16
-MACRO_DEC_LOCAL16 0 ;endloc
+MACRO_DEC_LOCAL16 0 ; endloc
 LOAD_LOCAL16 0 ; endloc
 PUSH16 #10000
 LESS_OR_EQ16
@@ -160,13 +160,13 @@ JT @while1_begin
 :while1_endwhile
 RET
 :function_draw_borders
-;()
+; ()
 ; Byte w
 PUSHN 1
 PUSH 0
 PUSH 16
 SYSCALL Std.SetConsoleColors
-MACRO_SET_LOCAL 0 50 ;w
+MACRO_SET_LOCAL 0 50 ; w
 :while2_begin
 LOAD_LOCAL 0 ; w
 PUSH 0
@@ -178,14 +178,14 @@ PUSH 22
 SYSCALL Std.SetConsoleCursorPosition
 PUSH 35
 SYSCALL Std.PrintCharPop
-MACRO_DEC_LOCAL 0 ;w
+MACRO_DEC_LOCAL 0 ; w
 LOAD_LOCAL 0 ; w
 MACRO_CONDITIONAL_JF 6 @if1_endif
 JMP @while2_endwhile
 :if1_endif
 JMP @while2_begin
 :while2_endwhile
-MACRO_SET_LOCAL 0 22 ;w
+MACRO_SET_LOCAL 0 22 ; w
 :while3_begin
 PUSH 1
 LOAD_LOCAL 0 ; w
@@ -197,7 +197,7 @@ LOAD_LOCAL 0 ; w
 SYSCALL Std.SetConsoleCursorPosition
 PUSH 35
 SYSCALL Std.PrintCharPop
-MACRO_DEC_LOCAL 0 ;w
+MACRO_DEC_LOCAL 0 ; w
 LOAD_LOCAL 0 ; w
 MACRO_CONDITIONAL_JF 6 @if2_endif
 JMP @while3_endwhile
@@ -206,21 +206,21 @@ JMP @while3_begin
 :while3_endwhile
 RET
 :function_write_initial_body
-;()
+; ()
 ; Byte X
 ; Byte Y
 ; Byte L
 ; Addr loc[]
 PUSHN 5
-MACRO_SET_LOCAL 0 20 ;X
-MACRO_SET_LOCAL 1 10 ;Y
-MACRO_SET_LOCAL 2 0 ;L
+MACRO_SET_LOCAL 0 20 ; X
+MACRO_SET_LOCAL 1 10 ; Y
+MACRO_SET_LOCAL 2 0 ; L
 :while4_begin
 LOAD_LOCAL 2 ; L
 PUSH 5
 MACRO_CONDITIONAL_JF 4 @while4_endwhile
 LOAD_LOCAL 0 ; X
-LOAD_LOCAL 1 ; Y
+PUSH 10
 LOAD_LOCAL16 3 ; loc
 CALL @function_xy_to_mem_loc
 STORE_LOCAL16 3 ; loc
@@ -230,21 +230,21 @@ EXTEND
 INC16
 LOAD_LOCAL16 3 ; loc
 STORE_GLOBAL16
-MACRO_INC_LOCAL 2 ;L
-MACRO_INC_LOCAL 0 ;X
+MACRO_INC_LOCAL 2 ; L
+MACRO_INC_LOCAL 0 ; X
 JMP @while4_begin
 :while4_endwhile
 RET
 :function_redraw
-;(Addr current_length)
+; (Addr current_length)
 ; Byte X
 ; Byte Y
 ; Addr loc[]
 ; Addr value
 PUSHN 6
-MACRO_SET_LOCAL 0 49 ;X
+MACRO_SET_LOCAL 0 49 ; X
 :while5_begin
-MACRO_SET_LOCAL 1 21 ;Y
+MACRO_SET_LOCAL 1 21 ; Y
 :while6_begin
 LOAD_LOCAL 0 ; X
 LOAD_LOCAL 1 ; Y
@@ -276,14 +276,14 @@ PUSH 111
 SYSCALL Std.PrintCharPop
 :if4_endif
 :if3_endif
-MACRO_DEC_LOCAL 1 ;Y
+MACRO_DEC_LOCAL 1 ; Y
 LOAD_LOCAL 1 ; Y
 MACRO_CONDITIONAL_JF 6 @if5_endif
 JMP @while6_endwhile
 :if5_endif
 JMP @while6_begin
 :while6_endwhile
-MACRO_DEC_LOCAL 0 ;X
+MACRO_DEC_LOCAL 0 ; X
 LOAD_LOCAL 0 ; X
 PUSH 1
 MACRO_CONDITIONAL_JF 0 @if6_endif
@@ -293,7 +293,7 @@ JMP @while5_begin
 :while5_endwhile
 RET
 :function_draw_head
-;()
+; ()
 PUSH 0
 PUSH 3
 SYSCALL Std.SetConsoleColors
@@ -304,7 +304,7 @@ PUSH 15
 SYSCALL Std.SetConsoleColors
 RET
 :function_draw_fruit
-;(Byte X, Byte Y)
+; (Byte X, Byte Y)
 LOAD_ARG 2 ; X
 LOAD_ARG 1 ; Y
 SYSCALL Std.SetConsoleCursorPosition
@@ -318,7 +318,7 @@ PUSH 15
 SYSCALL Std.SetConsoleColors
 RET
 :function_new_direction
-;(Byte key, Byte direction&)
+; (Byte key, Byte direction&)
 LOAD_ARG 2 ; key
 PUSH 119
 MACRO_CONDITIONAL_JF 0 @if7_else
@@ -351,7 +351,7 @@ STORE_ARG 1 ; direction
 :if7_endif
 RET
 :function_next_head_position
-;(Byte headX&, Byte headY&, Byte direction)
+; (Byte headX&, Byte headY&, Byte direction)
 LOAD_ARG 1 ; direction
 PUSH 3
 MACRO_CONDITIONAL_JF 0 @if11_else
@@ -388,7 +388,7 @@ STORE_ARG 3 ; headX
 :if11_endif
 RET
 :function_random_fruit_position
-;(Byte fruit_x&, Byte fruit_y&)
+; (Byte fruit_x&, Byte fruit_y&)
 ; Addr mem_ptr[]
 PUSHN 2
 :while7_begin
@@ -414,16 +414,16 @@ JT @while7_begin
 :while7_endwhile
 RET
 :function_move_body
-;()
+; ()
 ; Byte Y
 ; Addr loc[]
 ; Byte X
 ; Addr value
 PUSHN 6
-MACRO_SET_LOCAL 0 21 ;Y
+MACRO_SET_LOCAL 0 21 ; Y
 :while8_begin
-MACRO_SET_LOCAL 3 49 ;X
-LOAD_LOCAL 3 ; X
+MACRO_SET_LOCAL 3 49 ; X
+PUSH 49
 LOAD_LOCAL 0 ; Y
 LOAD_LOCAL16 1 ; loc
 CALL @function_xy_to_mem_loc
@@ -439,7 +439,7 @@ JF @if15_endif
 LOAD_LOCAL 3 ; X
 LOAD_LOCAL 0 ; Y
 SYSCALL Std.SetConsoleCursorPosition
-MACRO_DEC_LOCAL16 4 ;value
+MACRO_DEC_LOCAL16 4 ; value
 LOAD_LOCAL16 4 ; value
 ZERO16
 JF @if16_else
@@ -454,7 +454,7 @@ LOAD_LOCAL16 4 ; value
 LOAD_LOCAL16 1 ; loc
 STORE_GLOBAL16
 :if15_endif
-MACRO_DEC_LOCAL 3 ;X
+MACRO_DEC_LOCAL 3 ; X
 LOAD_LOCAL16 1 ; loc
 SUB16C #2
 STORE_LOCAL16 1 ; loc
@@ -465,7 +465,7 @@ JMP @while9_endwhile
 :if17_endif
 JMP @while9_begin
 :while9_endwhile
-MACRO_DEC_LOCAL 0 ;Y
+MACRO_DEC_LOCAL 0 ; Y
 LOAD_LOCAL 0 ; Y
 MACRO_CONDITIONAL_JF 6 @if18_endif
 JMP @while8_endwhile
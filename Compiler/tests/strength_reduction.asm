@@ -0,0 +1,95 @@
+PUSH 201
+PUSH16 #50001
+CALL @function_show
+POPN 3
+HALT
+:function_show
+; (Byte b, Addr a)
+LOAD_ARG 3 ; b
+PUSH 4
+RSH
+SYSCALL Std.PrintInt
+POP
+PUSH16 @string_1
+SYSCALL Std.PrintString
+LOAD_ARG 3 ; b
+PUSH 31
+AND
+SYSCALL Std.PrintInt
+POP
+PUSH16 @string_1
+SYSCALL Std.PrintString
+LOAD_ARG 3 ; b
+MACRO_DIV2
+SYSCALL Std.PrintInt
+POP
+PUSH16 @string_1
+SYSCALL Std.PrintString
+LOAD_ARG 3 ; b
+PUSH 0
+AND
+SYSCALL Std.PrintInt
+POP
+PUSH16 @string_1
+SYSCALL Std.PrintString
+LOAD_ARG 3 ; b
+SYSCALL Std.PrintInt
+POP
+SYSCALL Std.PrintNewLine
+LOAD_ARG16 2 ; a
+PUSH16 #4
+RSH16
+SYSCALL Std.PrintInt16
+POPN 2
+PUSH16 @string_1
+SYSCALL Std.PrintString
+LOAD_ARG16 2 ; a
+PUSH16 #31
+AND16
+SYSCALL Std.PrintInt16
+POPN 2
+PUSH16 @string_1
+SYSCALL Std.PrintString
+LOAD_ARG16 2 ; a
+PUSH16 #1
+RSH16
+SYSCALL Std.PrintInt16
+POPN 2
+PUSH16 @string_1
+SYSCALL Std.PrintString
+LOAD_ARG16 2 ; a
+PUSH16 #8
+RSH16
+SYSCALL Std.PrintInt16
+POPN 2
+PUSH16 @string_1
+SYSCALL Std.PrintString
+LOAD_ARG16 2 ; a
+PUSH16 #1023
+AND16
+SYSCALL Std.PrintInt16
+POPN 2
+SYSCALL Std.PrintNewLine
+LOAD_ARG 3 ; b
+EXTEND
+PUSH16 #255
+AND16
+SYSCALL Std.PrintInt16
+POPN 2
+PUSH16 @string_1
+SYSCALL Std.PrintString
+LOAD_ARG16 2 ; a
+PUSH16 #7
+SWAP16
+MOD16
+SYSCALL Std.PrintInt16
+POPN 2
+PUSH16 @string_1
+SYSCALL Std.PrintString
+PUSH 8
+SYSCALL Std.PrintInt
+POP
+SYSCALL Std.PrintNewLine
+RET
+:string_1
+" "
\ No newline at end of file
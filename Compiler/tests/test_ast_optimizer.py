@@ -0,0 +1,84 @@
+import glob
+import os
+import unittest
+
+from ast_optimizer import AstOptimizer
+from myast import Function, GroupOfStatements
+from recursive_descent_parser import Parser
+
+
+class TestAstOptimizer(unittest.TestCase):
+    def test_same_code_as_whole_tree_passes(self):
+        for filename in glob.glob(os.path.join(os.path.dirname(__file__), "*.prg")):
+            with self.subTest(filename), open(filename, "rt") as f:
+                program = f.read()
+                expected_tree = Parser(program).do_parse()
+                try:
+                    while expected_tree.optimize():
+                        pass
+                except TypeError:
+                    continue  # constant logical expressions are not supported yet
+                tree = Parser(program).do_parse()
+                AstOptimizer(tree).run()
+                self.assertEqual(expected_tree.gen_code(True).codes, tree.gen_code(True).codes)
+
+    def test_unchanged_subtrees_are_not_visited_again(self):
+        tree = Parser("byte a = 1; byte b = 2; a = b + 0; b = a * 2;").do_parse()
+        optimizer = AstOptimizer(tree)
+        self.assertTrue(optimizer.run())
+        self.assertGreater(optimizer.rounds, 1)
+        self.assertGreater(optimizer.saved_visits, 0)
+
+        again = AstOptimizer(tree)
+        self.assertFalse(again.run())
+        self.assertEqual(0, again.rounds)
+        self.assertEqual(0, again.visits)
+
+    def test_removed_statement_inside_function(self):
+        tree = Parser("""
+        function f()
+        begin
+            byte a = 1;
+            a = a;
+            if 0 then a = 2;
+            print a;
+        end
+        call f();
+        """).do_parse()
+        AstOptimizer(tree).run()
+        code = tree.gen_code(True).codes
+        self.assertFalse(any("if1" in str(line) for line in code))
+
+
+class TestResolvedScope(unittest.TestCase):
+    def test_scope_follows_moved_node(self):
+        tree = Parser("""
+        byte a = 1;
+        function f(byte x)
+        begin
+            print x + 1;
+        end
+        a = a + 1;
+        """).do_parse()
+        function = next(b for b in tree.blocks if isinstance(b, Function))
+        statement = function.body.statements[0] if isinstance(function.body, GroupOfStatements) else function.body
+        expression = next(statement.children())
+        self.assertEqual("f", expression.scope)
+        self.assertIs(tree.symbol_table, expression.symbol_table)
+
+        function.replace_child(function.body, GroupOfStatements(function.line_no, []))
+        tree.blocks.append(statement)
+        tree.set_parents()
+        self.assertEqual("", expression.scope)
+        self.assertIs(tree.symbol_table, expression.symbol_table)
+
+    def test_scope_setter_updates_children(self):
+        tree = Parser("byte a = 1; print a;").do_parse()
+        node = tree.blocks[-1]
+        self.assertEqual("", node.scope)
+        tree.scope = "other"
+        self.assertEqual("other", node.scope)
+
+
+if __name__ == '__main__':
+    unittest.main()
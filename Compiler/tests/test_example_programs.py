@@ -70,6 +70,9 @@ class TestExamples(unittest.TestCase, Helpers):
     def test_bool_expr(self):
         self.compare_programs("bool_expr.prg", "bool_expr.asm")
 
+    def test_bool_expr_opt(self):
+        self.compare_programs("bool_expr.prg", "bool_expr_opt.asm", optimize=True)
+
     def test_arrays_opt(self):
         self.compare_programs("typed_arrays.prg", "typed_arrays_opt.asm", optimize=True)
 
@@ -112,6 +115,12 @@ class TestExamples(unittest.TestCase, Helpers):
     def test_constant_folding(self):
         self.compare_programs("constant_folding.prg", "constant_folding.asm", optimize=True)
 
+    def test_strength_reduction(self):
+        self.compare_programs("strength_reduction.prg", "strength_reduction.asm", optimize=True)
+
+    def test_constant_propagation(self):
+        self.compare_programs("constant_propagation.prg", "constant_propagation.asm", optimize=True)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from myast import BinOpType, UnOpType, UnaryOperation, Number, VariableUsageRHS, LogicalChainOperation
+from recursive_descent_parser import Parser
+
+
+class TestExpressionParser(unittest.TestCase):
+    @staticmethod
+    def _parse(expression: str):
+        """ Returns the right side of assignment to a variable, and the tree """
+        tree = Parser(f"byte a; byte b; byte c; a = {expression};").do_parse()
+        return tree.blocks[-1].value, tree
+
+    def _structure(self, node):
+        """ Nested tuples of operations and names/values of leafs """
+        if isinstance(node, VariableUsageRHS):
+            return node.name
+        if isinstance(node, Number):
+            return node.value
+        if isinstance(node, UnaryOperation):
+            return node.op, self._structure(node.operand)
+        return node.op, self._structure(node.operand1), self._structure(node.operand2)
+
+    def assert_structure(self, expected, expression: str):
+        node, _ = self._parse(expression)
+        self.assertEqual(expected, self._structure(node))
+
+    def test_precedence(self):
+        self.assert_structure((BinOpType.Add, "a", (BinOpType.Mul, "b", "c")), "a + b * c")
+        self.assert_structure((BinOpType.Mul, (BinOpType.Add, "a", "b"), "c"), "(a + b) * c")
+        self.assert_structure(
+            (BinOpType.LogicalOr, (BinOpType.LogicalAnd, (BinOpType.Equals, "a", 1), (BinOpType.Lt, "b", "c")),
+             (BinOpType.Gt, "c", (BinOpType.BitOr, "a", (BinOpType.Lsh, "b", 2)))),
+            "a == 1 && b < c || c > a | b << 2")
+
+    def test_left_associativity(self):
+        self.assert_structure((BinOpType.Sub, (BinOpType.Sub, "a", "b"), "c"), "a - b - c")
+        self.assert_structure((BinOpType.Div, (BinOpType.Mod, "a", "b"), 2), "a % b / 2")
+
+    def test_unary_applies_to_first_term(self):
+        self.assert_structure(
+            (BinOpType.Add, (UnOpType.UnaryMinus, (BinOpType.Mul, "a", "b")), "c"), "-a * b + c")
+        self.assert_structure((BinOpType.Equals, "a", (UnOpType.BitNegate, "b")), "a == ~b")
+        with self.assertRaises(Exception):
+            self._parse("a * -b")
+
+    def test_chain_shares_condition_counter(self):
+        node, _ = self._parse("a == 1 && b == 2 || c == 3")
+        self.assertIsInstance(node, LogicalChainOperation)
+        self.assertIsInstance(node.operand1, LogicalChainOperation)
+        self.assertEqual(node.condition_counter, node.operand1.condition_counter)
+
+    def test_deeply_nested_array_index(self):
+        depth = 300  # the old five-level recursion hit the recursion limit at about 190
+        expression = "arr[" * depth + "0" + "]" * depth
+        tree = Parser(f"byte arr[10]; byte a; a = {expression};").do_parse()
+        self.assertIsNotNone(tree)
+
+
+if __name__ == '__main__':
+    unittest.main()
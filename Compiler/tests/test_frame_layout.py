@@ -0,0 +1,56 @@
+import unittest
+
+from frame_layout import SlotOrigin, dump_frame_layouts
+from recursive_descent_parser import Parser
+
+
+class TestFrameLayout(unittest.TestCase):
+    def setUp(self):
+        self.tree = Parser("""
+        struct Point(byte x, addr y);
+        byte g;
+        addr h;
+        function f(byte a, addr b) begin
+            global h;
+            byte c;
+            Point p;
+            addr d;
+        end
+        call f(1, 2);
+        """).do_parse()
+        self.tree.gen_code(False)
+
+    def test_offsets(self):
+        table = self.tree.symbol_table
+        layout = table.get_frame_layout("f")
+        self.assertEqual((SlotOrigin.Arg, 2, 2), self._slot(layout, "b"))
+        self.assertEqual((SlotOrigin.Arg, 3, 1), self._slot(layout, "a"))
+        self.assertEqual((SlotOrigin.Local, 0, 1), self._slot(layout, "c"))
+        self.assertEqual((SlotOrigin.Local, 1, 3), self._slot(layout, "p"))
+        self.assertEqual((SlotOrigin.Local, 4, 2), self._slot(layout, "d"))
+        self.assertEqual((SlotOrigin.Global, 1, 2), self._slot(layout, "h"))
+        self.assertEqual(6, layout.frame_size)
+        self.assertEqual(3, table.get_frame_layout("").frame_size)
+        self.assertIs(layout, table.get_frame_layout("f"))
+
+    def test_layout_rebuilt_after_new_variable(self):
+        table = self.tree.symbol_table
+        layout = table.get_frame_layout("f")
+        table.register_variable("f", "e", layout.get_slot("c").variable.type)
+        self.assertIsNot(layout, table.get_frame_layout("f"))
+        self.assertEqual(7, table.get_frame_layout("f").frame_size)
+
+    def test_dump(self):
+        report = dump_frame_layouts(self.tree.symbol_table)
+        self.assertIn("main program: frame 3 bytes", report)
+        self.assertIn("function f: frame 6 bytes", report)
+        self.assertIn("Point p", report)
+
+    @staticmethod
+    def _slot(layout, name):
+        slot = layout.get_slot(name)
+        return slot.origin, slot.offset, slot.size
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from codegen_helpers import CodeSnippet
+from instructions import Instruction, Opcode, Imm16, LabelRef
+from optimizer import peephole_optimize, PeepholeOptimizer, Rule, Op, Var, Emit
+from recursive_descent_parser import Parser
+
+
+class TestInstructions(unittest.TestCase):
+    def test_render(self):
+        self.assertEqual("PUSH 3", str(Instruction(Opcode.PUSH, 3)))
+        self.assertEqual("PUSH16 #300 ; x", str(Instruction(Opcode.PUSH16, Imm16(300), comment="x")))
+        self.assertEqual("JF16 @if1_else", str(Instruction(Opcode.JF16, LabelRef("if1_else"))))
+        self.assertEqual("MACRO_CONDITIONAL_JF 2 @while0_endwhile",
+                         str(Instruction(Opcode.MACRO_CONDITIONAL_JF, 2, LabelRef("while0_endwhile"))))
+        self.assertEqual(":function_f", str(Instruction(Opcode.LABEL, "function_f")))
+        self.assertEqual("; Byte a", str(Instruction(Opcode.COMMENT, comment="Byte a")))
+        self.assertEqual('"Hello"', str(Instruction(Opcode.STRING, "Hello")))
+
+    def test_opcode_values_match_vm(self):
+        self.assertEqual(0, Opcode.NOP.value)
+        self.assertEqual(1, Opcode.PUSH.value)
+        self.assertEqual(143, Opcode.MACRO_LOAD_GLOBAL_VAR.value)
+
+    def test_source_lines(self):
+        tree = Parser("byte a = 1;\nprint a;\n").do_parse()
+        code = tree.gen_code(False)
+        self.assertEqual(len(code.codes), len(code.line_numbers))
+        self.assertEqual(2, code.codes[-2].line)  # SYSCALL Std.PrintInt / POP of line 2
+
+    def test_peephole_matches_opcodes(self):
+        snippet = CodeSnippet(1)
+        for instruction in (Instruction(Opcode.LOAD_LOCAL, 0, comment="a"), Instruction(Opcode.PUSH, 3),
+                            Instruction(Opcode.MUL), Instruction(Opcode.STORE_LOCAL, 0, comment="a"),
+                            Instruction(Opcode.LOAD_LOCAL, 0, comment="a"), Instruction(Opcode.LESS),
+                            Instruction(Opcode.JF, LabelRef("end"))):
+            snippet.add_line(instruction)
+        peephole_optimize(snippet)
+        self.assertEqual(["LOAD_LOCAL 0 ; a", "MACRO_X3", "STORE_LOCAL_KEEP 0 ; a", "MACRO_CONDITIONAL_JF 2 @end"],
+                         [str(c) for c in snippet.codes])
+
+    def test_custom_rules(self):
+        optimizer = PeepholeOptimizer([
+            Rule([Op(Opcode.PUSH, Var("n")), Op(Opcode.PUSH, Var("n")), Opcode.ADD],
+                 [Emit(Opcode.PUSH, lambda m: m["n"] * 2)], condition=lambda m: m["n"] < 100),
+            Rule([Opcode.PUSH, Opcode.POP], []),
+        ])
+        snippet = CodeSnippet(1)
+        for instruction in (Instruction(Opcode.PUSH, 4), Instruction(Opcode.PUSH, 2), Instruction(Opcode.PUSH, 2),
+                            Instruction(Opcode.ADD), Instruction(Opcode.ADD), Instruction(Opcode.PUSH, 100),
+                            Instruction(Opcode.PUSH, 100), Instruction(Opcode.ADD), Instruction(Opcode.PUSH, 7),
+                            Instruction(Opcode.POP)):
+            snippet.add_line(instruction)
+        optimizer.optimize(snippet)
+        # second rewrite is found only after backing up to the instruction before the first one
+        self.assertEqual(["PUSH 8", "PUSH 100", "PUSH 100", "ADD"],
+                         [str(c) for c in snippet.codes])
+
+
+class TestCodeSnippet(unittest.TestCase):
+    def test_nested_joins_keep_order(self):
+        inner = CodeSnippet(0)
+        expected = []
+        for level in range(3000):  # deeper than recursion limit
+            head = CodeSnippet(level, Instruction(Opcode.PUSH, level))
+            tail = CodeSnippet(level, Instruction(Opcode.POP))
+            inner = CodeSnippet.join((head, inner, None, tail))
+            expected = [f"PUSH {level}"] + expected + ["POP"]
+        self.assertEqual(2999, inner.ln)
+        self.assertEqual(len(expected), inner.size)
+        self.assertEqual("POP", str(inner.last_line))
+        inner.add_line(Instruction(Opcode.RET))
+        self.assertEqual(expected + ["RET"], [str(c) for c in inner.codes])
+        self.assertEqual(2999, inner.codes[-1].line)
+
+    def test_empty_join(self):
+        joined = CodeSnippet.join((CodeSnippet(5), None))
+        self.assertEqual([], joined.codes)
+        self.assertIsNone(joined.last_line)
+
+
+if __name__ == '__main__':
+    unittest.main()
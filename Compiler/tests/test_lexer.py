@@ -0,0 +1,94 @@
+import glob
+import os
+import unittest
+
+from lexer import Lexer, Symbol, TokenStreamLexer
+
+
+class TestTokenStreamLexer(unittest.TestCase):
+    @staticmethod
+    def _symbols(lexer):
+        while True:
+            lexer.next_symbol()
+            yield (lexer.current, lexer.current_identifier, lexer.current_number, lexer.current_string,
+                   lexer.line_number)
+            if lexer.current == Symbol.EOF:
+                break
+
+    def _assert_same_tokens(self, program: str):
+        expected = list(self._symbols(Lexer(program)))
+        actual = list(self._symbols(TokenStreamLexer(program)))
+        self.assertEqual(expected, actual)
+
+    def test_example_programs(self):
+        for filename in glob.glob(os.path.join(os.path.dirname(__file__), "*.prg")):
+            with self.subTest(filename), open(filename, "rt") as f:
+                self._assert_same_tokens(f.read())
+
+    def test_operators_and_comments(self):
+        self._assert_same_tokens("a = b / c // comment / with // slashes\n"
+                                 "if a >= 1 && b <= 2 || c != 3 then x = y << 2 >> 1 -> z;")
+
+    def test_keywords_are_case_insensitive(self):
+        self._assert_same_tokens("BEGIN While x Do PrintNL; END")
+
+    def test_strings_and_chars(self):
+        self._assert_same_tokens('print "say \\"hi\\"\\n"; x = \'\\n\'; y = \'a\'')
+
+    def test_numbers(self):
+        self._assert_same_tokens("x = 12 + #300 + 1.5 + .5")
+
+    def test_backup_restore(self):
+        lexer = TokenStreamLexer("byte a = 1;")
+        lexer.next_symbol()
+        lexer.next_symbol()
+        state = lexer.backup_state()
+        lexer.next_symbol()
+        lexer.next_symbol()
+        self.assertEqual(Symbol.Number, lexer.current)
+        lexer.restore_state(state)
+        self.assertEqual(Symbol.Identifier, lexer.current)
+        self.assertEqual("a", lexer.current_identifier)
+        lexer.next_symbol()
+        self.assertEqual(Symbol.Becomes, lexer.current)
+
+    def test_backup_state_is_token_index(self):
+        lexer = TokenStreamLexer("byte a = 1; b = 2;")
+        lexer.next_symbol()
+        self.assertEqual(1, lexer.backup_state())
+        lexer.restore_state(0)
+        self.assertEqual(Symbol.Nothing, lexer.current)
+        self.assertEqual(1, lexer.line_number)
+
+    def test_reset_restores_values_of_previous_tokens(self):
+        lexer = TokenStreamLexer("a = 1;\nb = \"x\";")
+        for _ in range(4):
+            lexer.next_symbol()
+        mark = lexer.mark()
+        while lexer.current != Symbol.EOF:
+            lexer.next_symbol()
+        self.assertEqual("b", lexer.current_identifier)
+        self.assertEqual("x", lexer.current_string)
+        self.assertEqual(2, lexer.line_number)
+        lexer.reset(mark)
+        self.assertEqual(Symbol.Semicolon, lexer.current)
+        self.assertEqual("a", lexer.current_identifier)
+        self.assertEqual(1, lexer.current_number)
+        self.assertEqual("", lexer.current_string)
+        self.assertEqual(1, lexer.line_number)
+
+    def test_peek(self):
+        lexer = TokenStreamLexer("Point p;")
+        lexer.next_symbol()
+        self.assertEqual(Symbol.Identifier, lexer.peek())
+        self.assertEqual(Symbol.Semicolon, lexer.peek(2))
+        self.assertEqual(Symbol.EOF, lexer.peek(10))
+        self.assertEqual("Point", lexer.current_identifier)
+
+    def test_unterminated_string(self):
+        with self.assertRaises(Exception):
+            TokenStreamLexer('print "abc;')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -41,37 +41,37 @@ PUSH16 #0
 PUSH16 #0
 PUSH16 #0
 PUSH16 #0
-MACRO_SET_LOCAL 6 3 ;num
-PUSH16 #1
-LOAD_LOCAL 6 ; num
-MACRO_LSH16_BY8
-STORE_LOCAL16 8 ; val
-MACRO_SET_LOCAL 10 1 ;i
-MACRO_SET_LOCAL 11 2 ;j
-MACRO_SET_LOCAL 12 3 ;box_index
+MACRO_SET_LOCAL 6 3 ; num
+MACRO_SET_LOCAL16 8 #8 ; val
+MACRO_SET_LOCAL 10 1 ; i
+MACRO_SET_LOCAL 11 2 ; j
+MACRO_SET_LOCAL 12 3 ; box_index
 LOAD_LOCAL16 0 ; row
-LOAD_LOCAL 10 ; i
-MACRO_POP_EXT_X2_ADD16_LG16_LL16 8 ; val
+ADD16C #2
+LOAD_GLOBAL16
+PUSH16 #8
 AND16
 DUP16
 JT16 @cond1_expr_end
 LOAD_LOCAL16 2 ; col
-LOAD_LOCAL 11 ; j
-MACRO_POP_EXT_X2_ADD16_LG16_LL16 8 ; val
+ADD16C #4
+LOAD_GLOBAL16
+PUSH16 #8
 AND16
 OR16
 DUP16
 JT16 @cond1_expr_end
 LOAD_LOCAL16 4 ; box
-LOAD_LOCAL 12 ; box_index
-MACRO_POP_EXT_X2_ADD16_LG16_LL16 8 ; val
+ADD16C #6
+LOAD_GLOBAL16
+PUSH16 #8
 AND16
 OR16
 :cond1_expr_end
 JF16 @if1_else
-MACRO_SET_LOCAL 7 0 ;ok
+MACRO_SET_LOCAL 7 0 ; ok
 JMP @if1_endif
 :if1_else
-MACRO_SET_LOCAL 7 1 ;ok
+MACRO_SET_LOCAL 7 1 ; ok
 :if1_endif
 HALT
\ No newline at end of file
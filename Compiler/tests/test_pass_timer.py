@@ -0,0 +1,47 @@
+import json
+import unittest
+
+from ast_optimizer import AstOptimizer
+from pass_timer import PassTimer
+from recursive_descent_parser import Parser
+
+
+class TestPassTimer(unittest.TestCase):
+    def setUp(self):
+        self.timer = PassTimer()
+
+    def tearDown(self):
+        self.timer.stop()
+
+    def test_nested_phases(self):
+        with self.timer.phase("outer"):
+            for _ in range(3):
+                with self.timer.phase("inner"):
+                    data = [0] * 10000
+        outer, inner = self.timer.phases["outer"], self.timer.phases["inner"]
+        self.assertEqual(1, outer.calls)
+        self.assertEqual(3, inner.calls)
+        self.assertAlmostEqual(outer.total_time, outer.self_time + inner.total_time)
+        self.assertGreaterEqual(inner.peak_bytes, 80000)
+        self.assertGreaterEqual(outer.peak_bytes, inner.peak_bytes)
+        self.assertEqual(10000, len(data))
+
+    def test_compiler_report(self):
+        tree = Parser("byte a = 2 + 3;\nprint a * 1;\nfunction f()\nbegin\n    print 1;\nend\n").do_parse()
+        AstOptimizer(tree, self.timer).run()
+        with self.timer.phase("gen_code"):
+            tree.gen_code(True, self.timer)
+        report = json.loads(self.timer.to_json())
+        self.assertEqual(["ast optimize", "gen_code", "peephole"], list(report["phases"]))
+        self.assertEqual(2, report["phases"]["peephole"]["calls"])  # main program and function f
+        details = report["details"]["ast optimizer"]
+        self.assertEqual(3, details["rounds"])
+        self.assertEqual({"SumOperation._optimize_node": 1, "MultiplyOperation._optimize_node": 1,
+                          "Assign._optimize_node": 1}, details["fired"])
+        table = self.timer.table()
+        self.assertIn("peephole", table)
+        self.assertIn("SumOperation._optimize_node: 1", table)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,13 +26,12 @@ PUSH 44
 LOAD_LOCAL16 0 ; arr
 ADD16C #3
 STORE_GLOBAL
-MACRO_SET_LOCAL 2 4 ;X
+MACRO_SET_LOCAL 2 4 ; X
 PUSH 55
 LOAD_LOCAL16 0 ; arr
-LOAD_LOCAL 2 ; X
-MACRO_ADD8_TO_16
+ADD16C #4
 STORE_GLOBAL
-MACRO_SET_LOCAL 3 0 ;counter
+MACRO_SET_LOCAL 3 0 ; counter
 :while3_begin
 LOAD_LOCAL 3 ; counter
 PUSH 4
@@ -44,12 +43,12 @@ LOAD_GLOBAL
 SYSCALL Std.PrintInt
 POP
 SYSCALL Std.PrintNewLine
-MACRO_INC_LOCAL 3 ;counter
+MACRO_INC_LOCAL 3 ; counter
 JMP @while3_begin
 :while3_endwhile
 PUSH16 @string_2
 SYSCALL Std.PrintString
-MACRO_SET_LOCAL 4 0 ;sum8
+MACRO_SET_LOCAL 4 0 ; sum8
 LOAD_LOCAL16 0 ; arr
 LOAD_LOCAL 4 ; sum8
 CALL @function_sum8bit
@@ -84,7 +83,7 @@ PUSH16 #55
 LOAD_LOCAL16 5 ; arr2
 ADD16C #8
 STORE_GLOBAL16
-MACRO_SET_LOCAL 3 0 ;counter
+MACRO_SET_LOCAL 3 0 ; counter
 :while4_begin
 LOAD_LOCAL 3 ; counter
 PUSH 4
@@ -95,12 +94,12 @@ MACRO_POP_EXT_X2_ADD16_LG16
 SYSCALL Std.PrintInt16
 POPN 2
 SYSCALL Std.PrintNewLine
-MACRO_INC_LOCAL 3 ;counter
+MACRO_INC_LOCAL 3 ; counter
 JMP @while4_begin
 :while4_endwhile
 PUSH16 @string_2
 SYSCALL Std.PrintString
-MACRO_SET_LOCAL16 7 #0 ;sum16
+MACRO_SET_LOCAL16 7 #0 ; sum16
 LOAD_LOCAL16 5 ; arr2
 LOAD_LOCAL16 7 ; sum16
 CALL @function_sum16bit
@@ -112,10 +111,10 @@ POPN 2
 SYSCALL Std.PrintNewLine
 HALT
 :function_sum8bit
-;(Byte data[], Byte sum&)
+; (Byte data[], Byte sum&)
 ; Byte counter
 PUSHN 1
-MACRO_SET_LOCAL 0 0 ;counter
+MACRO_SET_LOCAL 0 0 ; counter
 PUSH 0
 STORE_ARG 1 ; sum
 :while1_begin
@@ -129,15 +128,15 @@ MACRO_ADD8_TO_16
 LOAD_GLOBAL
 ADD
 STORE_ARG 1 ; sum
-MACRO_INC_LOCAL 0 ;counter
+MACRO_INC_LOCAL 0 ; counter
 JMP @while1_begin
 :while1_endwhile
 RET
 :function_sum16bit
-;(Addr data[], Addr sum&)
+; (Addr data[], Addr sum&)
 ; Byte counter
 PUSHN 1
-MACRO_SET_LOCAL 0 0 ;counter
+MACRO_SET_LOCAL 0 0 ; counter
 PUSH16 #0
 STORE_ARG16 2 ; sum
 :while2_begin
@@ -150,7 +149,7 @@ LOAD_LOCAL 0 ; counter
 MACRO_POP_EXT_X2_ADD16_LG16
 ADD16
 STORE_ARG16 2 ; sum
-MACRO_INC_LOCAL 0 ;counter
+MACRO_INC_LOCAL 0 ; counter
 JMP @while2_begin
 :while2_endwhile
 RET